@@ -1,3 +1,6 @@
+import time
+# Start of this script run, for the cold-start and rerun time budgets
+SCRIPT_STARTED = time.perf_counter()
 import streamlit as st
 import os  # Add import for environment variables
 # Set page config must be the first Streamlit command
@@ -16,19 +19,114 @@ st.set_page_config(
     }
 )
 
-import asyncio
-import pandas as pd
-import shutil
-import time
 import datetime
+import sqlite3
+import tempfile
+import uuid
+from modules.actionLog import ActionLog
+from modules.archive import ArchivePolicy
+from modules.backupStore import BackupStore
+from modules.changeJournal import ChangeJournal, RecoveryError
+from modules.caseService import CaseServiceError, RemoteDatabase
 from modules.dbCon import Database
+from modules.logTail import read_last_lines, read_new_lines
+from modules.metrics import instrument, metrics, timed
+from modules.searchService import SearchService
 from streamlit_cookies_manager import EncryptedCookieManager
 
-# Initialize the database
-db = Database()
-asyncio.run(db.connect())
+# Initialize the database once per process. With CASE_SERVICE_ADDRESS set,
+# every worker talks to one shared case service instead of opening the file;
+# otherwise the returned facade runs queries on the database's own event loop.
+@st.cache_resource
+def get_database():
+    address = os.environ.get('CASE_SERVICE_ADDRESS')
+    if address:
+        return RemoteDatabase(address, os.environ.get('CASE_DB_FILE', 'db/data.db'))
+    # Closed and disposed cases untouched for ARCHIVE_AFTER_DAYS move to db/data.archive.db
+    # Pooled readers keep sessions' reads off the writer connection and its uncommitted writes
+    return Database(
+        readers=int(os.environ.get('CASE_DB_READERS', 2)),
+        archive_policy=ArchivePolicy(min_age_days=int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))),
+    ).start()
+
+db = get_database()
+
+# Debounces, coalesces and interrupts the case list searches. Only for a
+# database in this process: the case service's connections are out of reach.
+@st.cache_resource
+def get_search_service():
+    if isinstance(db, RemoteDatabase):
+        return None
+    return SearchService(db.database).start()
+
+search_service = get_search_service()
+
+@st.cache_resource
+def get_backup_store():
+    return BackupStore('backups')
+
+backup_store = get_backup_store()
+
+@st.cache_resource
+def get_action_log():
+    return ActionLog('logs')
+
+action_log = get_action_log()
+
+@st.cache_resource
+def get_change_journal():
+    return ChangeJournal('backups/journal')
+
+change_journal = get_change_journal()
+
+# With METRICS_PORT set, Prometheus can scrape this worker's timings at /metrics
+@st.cache_resource
+def get_metrics_server():
+    port = os.environ.get('METRICS_PORT')
+    return metrics.serve(('0.0.0.0', int(port))) if port else None
+
+get_metrics_server()
+
+# Time budgets, in seconds, for the first script run in a process and for every rerun after it
+COLD_START_BUDGET = 3.0
+RERUN_BUDGET = 0.3
+
+# Read the stylesheet once per process. Streamlit drops elements a run does
+# not emit again, so it is still sent once per run, as a single element.
+@st.cache_resource
+def get_stylesheet():
+    with open('assets/style.css') as f:
+        return f"<style>\n{f.read()}</style>"
+
+st.markdown(get_stylesheet(), unsafe_allow_html=True)
 
-# Initialize the cookie manager with a password
+# Set by the first script run in this process, which is timed as the cold start
+@st.cache_resource
+def get_process_state():
+    return {'warm': False}
+
+def record_script_time():
+    # Everything up to the end of this run, imports included on the first one
+    process = get_process_state()
+    name = 'app.script' if process['warm'] else 'app.cold_start'
+    process['warm'] = True
+    metrics.observe(name, time.perf_counter() - SCRIPT_STARTED)
+
+# Automatic backups ship the change journal and take a full base snapshot only this often
+BASE_SNAPSHOT_INTERVAL = datetime.timedelta(days=1)
+
+# Number of cases fetched and rendered per page of a case list
+PAGE_SIZE = 50
+# Facet buttons shown per facet of the case list, and how many to a row
+FACET_VALUES = 12
+FACET_COLUMNS = 4
+# Lines read per step of the raw log viewer, and the most it keeps on screen
+TAIL_LINES = 200
+MAX_TAIL_LINES = 5000
+
+# Initialize the cookie manager with a password. It holds this browser's
+# cookies, so unlike the resources above it is created on every run; the
+# library already caches the expensive key derivation.
 cookies = EncryptedCookieManager(
     prefix='case_manager/',
     password='your-secure-password-here'  # Replace with a secure password
@@ -36,16 +134,13 @@ cookies = EncryptedCookieManager(
 
 if not cookies.ready():
     # Wait for the component to load and send us current cookies.
+    record_script_time()
     st.stop()
 
 # Function to log actions
 def log_action(action, user):
-    timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     ip_address = st.session_state.get('ip_address', 'Unknown')
-    log_entry = f"{timestamp} - {user} - {ip_address} - {action}\n"
-    os.makedirs('logs', exist_ok=True)
-    with open('logs/logs.txt', 'a') as f:
-        f.write(log_entry)
+    action_log.record(action, user, ip_address)
 
 # Authentication
 def authenticate(username, password):
@@ -62,6 +157,7 @@ def authenticate(username, password):
         return None
 
 # Main app
+@instrument('app.rerun')
 def main():
     if 'authenticated' not in st.session_state:
         if cookies.get('remember_me') == 'True':
@@ -138,6 +234,7 @@ def logout():
     cookies.save()
     st.rerun()
 
+@instrument('app.admin_dashboard')
 def admin_dashboard(username):
     st.markdown("""
         <div style='text-align: center; margin-bottom: 2rem;'>
@@ -150,21 +247,20 @@ def admin_dashboard(username):
     with st.container():
         st.markdown("<div style='margin: 2rem 0;'>", unsafe_allow_html=True)
         col1, col2, col3, col4 = st.columns(4)
-        cases = asyncio.run(db.get_all_cases())
-        df = pd.DataFrame(cases, columns=['Serial Number', 'District', 'Case Number', 'Party Name', 'Status'])
+        stats = db.get_dashboard_stats()
         
         with col1:
-            st.metric("Total Cases", len(cases))
+            st.metric("Total Cases", stats['total'])
         with col2:
-            st.metric("Active Cases", len(df[df['Status'].str.lower() == 'active'].dropna()))
+            st.metric("Active Cases", stats['active'])
         with col3:
-            st.metric("Districts", len(df['District'].unique()))
+            st.metric("Districts", stats['districts'])
         with col4:
-            st.metric("Recent Additions", len(df[df['Serial Number'] > len(df) - 5]))
+            st.metric("Recent Additions", stats['recent'])
         st.markdown("</div>", unsafe_allow_html=True)
 
     # Main Interface
-    tab1, tab2, tab3 = st.tabs(["Database", "Logs", "Backups"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Database", "Logs", "Backups", "Diagnostics"])
     
     with tab1:
         manage_database()
@@ -172,6 +268,8 @@ def admin_dashboard(username):
         view_logs()
     with tab3:
         manage_backups()
+    with tab4:
+        diagnostics()
 
 def staff_dashboard():
     # Update welcome message to display the staff user's name
@@ -185,12 +283,19 @@ def staff_dashboard():
     view_cases()
     footer()
 
+@instrument('app.manage_database')
 def manage_database():
+    import pandas as pd
     st.header("Database Management")
-    # Display the database contents
-    cases = asyncio.run(get_all_cases())
-    df = pd.DataFrame(cases, columns=['Serial Number', 'District', 'Case Number', 'Party Name', 'Status'])
-    edited_df = st.data_editor(df, num_rows="dynamic", key="data_editor")
+    # Display one page of the database contents
+    cases, has_next = fetch_page('database_page')
+    with timed('app.manage_database.dataframe') as sample:
+        df = pd.DataFrame(cases, columns=['Serial Number', 'District', 'Case Number', 'Party Name', 'Status'])
+        sample['rows'] = len(df)
+    page_key = st.session_state['database_page']['cursors'][-1]
+    with timed('app.manage_database.data_editor'):
+        edited_df = st.data_editor(df, num_rows="dynamic", key=f"data_editor_{page_key}", disabled=["Serial Number"])
+    page_controls('database_page', cases, has_next)
     
     # Check if any edits were made
     if not edited_df.equals(df):
@@ -198,28 +303,123 @@ def manage_database():
 
     if st.session_state['edit_made']:
         if st.button("Save Changes", type="primary"):
-            # Save the edited dataframe back to the database
-            asyncio.run(update_cases(edited_df))
-            st.success("Changes saved successfully!")
-            log_action("Database edited", st.session_state['username'])
-            # Increment change counter
-            increment_change_counter()
-            st.session_state['edit_made'] = False
+            # Save only the rows that changed back to the database
+            added, edited, deleted = diff_cases(df, edited_df)
+            incomplete = [row for row in added + edited if not all(row[:3])]
+            if incomplete:
+                st.error("District, Case Number and Party Name are required")
+            else:
+                db.apply_case_changes(added, edited, deleted)
+                st.success(f"Changes saved successfully! ({len(added)} added, {len(edited)} edited, {len(deleted)} deleted)")
+                log_action("Database edited", st.session_state['username'])
+                # Increment change counter
+                increment_change_counter()
+                st.session_state['edit_made'] = False
 
     col1, col2 = st.columns(2)
     with col1:
         if st.button("Download Database"):
-            with open(db.db_file, 'rb') as f:
-                st.download_button('Download Database', f, file_name='cases.db')
+            # The live file alone misses whatever is still in its WAL, so take an online backup
+            previous = st.session_state.pop('database_download', None)
+            if previous and os.path.exists(previous):
+                os.remove(previous)
+            job = db.start_backup(scratch_path("download")).wait()
+            if job.ok:
+                st.session_state['database_download'] = job.target
+            else:
+                st.error(f"Could not copy the database: {job.error}")
+        download = st.session_state.get('database_download')
+        if download and os.path.exists(download):
+            with open(download, 'rb') as f:
+                st.download_button('Save cases.db', f, file_name='cases.db')
     with col2:
         uploaded_file = st.file_uploader("Upload Database", type="db")
-        if uploaded_file:
-            with open(db.db_file, 'wb') as f:
+        if uploaded_file and st.button("Replace Database With Upload"):
+            # Copied in through restore(), which migrates it and makes every session reload
+            upload = scratch_path("upload")
+            with open(upload, 'wb') as f:
                 f.write(uploaded_file.getbuffer())
-            st.success("Database uploaded")
-            log_action("Database uploaded", st.session_state['username'])
+            try:
+                restore_database(upload)
+            except (sqlite3.DatabaseError, CaseServiceError) as error:
+                st.error(f"Not a usable case database: {error}")
+            else:
+                st.success("Database uploaded")
+                log_action("Database uploaded", st.session_state['username'])
+            finally:
+                os.remove(upload)
+
+    # Bulk import from court lists, streamed in batches
+    uploaded_cases = st.file_uploader("Import Cases (CSV/Excel)", type=["csv", "xlsx"], key="case_import")
+    if uploaded_cases and st.button("Import Cases"):
+        progress_bar = st.progress(0.0, text="Importing cases...")
+
+        def show_progress(report, fraction):
+            progress_bar.progress(min(fraction or 0.0, 1.0), text=f"Read {report.rows} rows: {report.inserted} new, {report.updated} updated")
+
+        from modules.caseImporter import import_cases
+        kind = 'xlsx' if uploaded_cases.name.lower().endswith('.xlsx') else 'csv'
+        report = import_cases(db, uploaded_cases, kind, progress=show_progress)
+        progress_bar.progress(1.0, text="Import finished")
+        st.success(f"Imported {report.inserted} new and {report.updated} updated cases from {report.rows} rows")
+        if report.error_count:
+            st.warning(f"{report.error_count} rows were skipped")
+            st.dataframe(pd.DataFrame(report.errors, columns=['Line', 'Error']), hide_index=True)
+        log_action(f"Imported cases from {uploaded_cases.name}", st.session_state['username'])
+        increment_change_counter()
+
+    manage_archive()
+
+    # Export cases as a spreadsheet, streamed out of the database in batches
+    with st.expander("Export Cases"):
+        export_query = st.text_input("Only cases matching (leave empty for all)", key="export_query")
+        export_format = st.selectbox("Format", ["csv", "parquet"], key="export_format")
+        if st.button("Prepare Export"):
+            previous = st.session_state.pop('case_export', None)
+            if previous and os.path.exists(previous[0]):
+                os.remove(previous[0])
+            from modules.caseExporter import export_cases
+            fd, export_file = tempfile.mkstemp(suffix=f".{export_format}")
+            os.close(fd)
+            count = export_cases(db, export_file, export_format, {'query': export_query} if export_query else None)
+            st.session_state['case_export'] = (export_file, count)
+            log_action(f"Exported {count} cases", st.session_state['username'])
+        export = st.session_state.get('case_export')
+        if export and os.path.exists(export[0]):
+            export_file, count = export
+            with open(export_file, 'rb') as f:
+                st.download_button(f"Download {count} cases", f, file_name=f"cases{os.path.splitext(export_file)[1]}")
+
+def manage_archive():
+    with st.expander("Archive"):
+        st.write(f"{db.count_archived_cases()} closed and disposed cases are archived in a separate file.")
+        status = getattr(db, 'archive_status', None)
+        if status and status['last_run']:
+            st.caption(f"Last scheduled run {status['last_run']:%Y-%m-%d %H:%M}: {status['moved']} cases moved")
+            if status['error']:
+                st.error(f"Archiving failed: {status['error']}")
+        if st.button("Archive Now"):
+            moved = db.archive_cases()
+            st.success(f"Archived {moved} cases")
+            log_action(f"Archived {moved} cases", st.session_state['username'])
+        serials = st.text_input("Restore archived cases (serial numbers, comma separated)", key="unarchive_serials")
+        if st.button("Restore From Archive") and serials:
+            try:
+                serial_numbers = [int(serial) for serial in serials.replace(' ', '').split(',') if serial]
+            except ValueError:
+                st.error("Serial numbers must be whole numbers")
+            else:
+                try:
+                    moved = db.unarchive_cases(serial_numbers)
+                except (ValueError, CaseServiceError) as error:
+                    st.error(str(error))
+                else:
+                    st.success(f"Restored {moved} cases: {', '.join(map(str, serial_numbers))}")
+                    log_action(f"Restored archived cases {serial_numbers}", st.session_state['username'])
 
+@instrument('app.view_cases')
 def view_cases():
+    import pandas as pd
     st.header("Case Management")
     
     # Callback function to clear the search box
@@ -234,14 +434,37 @@ def view_cases():
         st.markdown("<br>", unsafe_allow_html=True)  # Spacing for alignment
         clear_search = st.button("Clear Search", on_click=clear_search_callback)
     
-    # Display search results or all cases
-    if search_query:
-        cases = asyncio.run(db.search_all_fields(search_query))
+    # Narrow the list by district and status; each facet counts what the other filters leave
+    selected = st.session_state.setdefault('case_facets', {'district': None, 'status': None})
+    filters = {key: value for key, value in {'query': search_query, **selected}.items() if value} or None
+    searching = search_query and search_service is not None
+    facet_area = st.container()
+    if searching:
+        # Started together with the page search and drawn once it is done, so
+        # typing debounces, supersedes and interrupts all three alike
+        facets_search = start_search(
+            'facets', (search_query, dict(selected)),
+            lambda session: search_service.submit_facets(session, search_query, selected),
+        )
+        count_search = start_search(
+            'count', filters,
+            lambda session: search_service.submit_count(session, search_query, filters),
+        )
     else:
-        cases = asyncio.run(db.get_all_cases())
+        with facet_area:
+            facet_columns(db.get_facets({'query': search_query, **selected}), selected)
+
+    # Display one page of the search results or all cases
+    fetch = search_page if searching else None
+    cases, has_next = fetch_page('cases_page', filters, fetch)
+    if searching:
+        with facet_area:
+            facet_columns(search_result(facets_search), selected)
 
     if cases:
-        df = pd.DataFrame(cases, columns=['Serial Number', 'District', 'Case Number', 'Party Name', 'Status'])
+        with timed('app.view_cases.dataframe') as sample:
+            df = pd.DataFrame(cases, columns=['Serial Number', 'District', 'Case Number', 'Party Name', 'Status'])
+            sample['rows'] = len(df)
         
         # Style the dataframe
         st.write("<div style='display: flex; justify-content: center;'>", unsafe_allow_html=True)
@@ -257,11 +480,33 @@ def view_cases():
             }
         )
         st.write("</div>", unsafe_allow_html=True)
+        page_controls('cases_page', cases, has_next)
         
-        st.info(f"Found {len(cases)} cases")
+        st.info(f"Found {search_result(count_search) if searching else db.count_cases(filters)} cases")
+    elif search_query and (similar := db.search_cases(search_query, PAGE_SIZE)):
+        # Nothing matched exactly: fall back to party names spelled like the query
+        st.warning("No exact matches. Showing cases with similar party names:")
+        st.dataframe(
+            pd.DataFrame(similar, columns=['Serial Number', 'District', 'Case Number', 'Party Name', 'Status']),
+            hide_index=True,
+            use_container_width=True,
+        )
     else:
         st.warning("No cases found")
 
+    # The archive is only opened when asked for
+    if st.checkbox("Include archived (closed and disposed) cases", key="search_archive"):
+        archived = db.search_archive(search_query, PAGE_SIZE)
+        st.caption(f"Archived cases{' matching the search' if search_query else ''} (newest {PAGE_SIZE}):")
+        if archived:
+            st.dataframe(
+                pd.DataFrame(archived, columns=['Serial Number', 'District', 'Case Number', 'Party Name', 'Status']),
+                hide_index=True,
+                use_container_width=True,
+            )
+        else:
+            st.write("No archived cases found")
+
     # Add new case interface
     with st.expander("Add New Case"):
         col1, col2 = st.columns(2)
@@ -274,7 +519,7 @@ def view_cases():
         
         if st.button("Add Case", type="primary", use_container_width=True):
             if district and case_number and party_name:
-                asyncio.run(db.add_case(district, case_number, party_name, status))
+                db.add_case(district, case_number, party_name, status)
                 st.success("✅ Case added successfully!")
                 log_action("New case added", st.session_state['username'])
                 time.sleep(1)
@@ -284,62 +529,393 @@ def view_cases():
             # Increment change counter
             increment_change_counter()
 
+@instrument('app.view_logs')
 def view_logs():
+    import pandas as pd
     st.header("Logs")
-    if os.path.exists('logs/logs.txt'):
-        with open('logs/logs.txt', 'r') as f:
-            logs = f.read()
-        st.text_area("Logs", logs, height=300)
+    if action_log.error is not None:
+        st.warning(f"Recent actions are not being saved: {action_log.error}")
+    mode = st.radio("View", ["Search", "Tail"], horizontal=True, key="log_mode")
+    if mode == "Tail":
+        tail_logs()
+        return
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        user = st.selectbox("User", ["All"] + action_log.users(), key="log_user")
+    with col2:
+        action = st.text_input("Action starts with", key="log_action")
+    with col3:
+        dates = st.date_input("Between", value=(), key="log_dates")
+    filters = {
+        'user': None if user == "All" else user,
+        'action': action or None,
+        'since': dates[0] if len(dates) > 0 else None,
+        'until': dates[1] + datetime.timedelta(days=1) if len(dates) > 1 else None,
+    }
+    with timed('app.view_logs.query') as sample:
+        entries, has_next = fetch_page('logs_page', filters, action_log.query)
+        sample['rows'] = len(entries)
+    if entries:
+        st.dataframe(
+            pd.DataFrame(entries, columns=['ID', 'Time', 'User', 'IP Address', 'Action']).drop(columns=['ID']),
+            hide_index=True,
+            use_container_width=True,
+        )
+        page_controls('logs_page', entries, has_next)
     else:
         st.write("No logs available")
 
+def tail_logs():
+    # Read raw log files backwards from the end instead of loading them whole
+    log_files = [path for path in (action_log.path, 'logs/logs.txt') if os.path.exists(path)]
+    if not log_files:
+        st.write("No logs available")
+        return
+    log_file = st.selectbox("Log file", log_files, key="tail_file")
+    state = st.session_state.setdefault('log_tail', {})
+    if state.get('file') != log_file:
+        with timed('app.view_logs.tail_read'):
+            lines, start, end = read_last_lines(log_file, TAIL_LINES)
+        # The live tail continues exactly where the initial read stopped
+        state.update(file=log_file, lines=lines, start=start, offset=end)
+    # Paging back stops once the window is full, so it never drops the newest lines
+    room = MAX_TAIL_LINES - len(state['lines'])
+    if st.button("Load Older", disabled=state['start'] == 0 or room <= 0):
+        older, state['start'], _ = read_last_lines(log_file, min(TAIL_LINES, room), state['start'])
+        state['lines'] = older + state['lines']
+    st.toggle("Live Tail", key="log_live")
+    tail_view()
+
+def tail_view():
+    # Poll for new lines only while Live Tail is on; the toggle reruns the page
+    live = st.session_state.get('log_live')
+    st.fragment(run_every=2 if live else None)(draw_tail)(live)
+
+def draw_tail(live):
+    state = st.session_state['log_tail']
+    if live:
+        # Only the bytes appended since the last read
+        new_lines, state['offset'] = read_new_lines(state['file'], state['offset'])
+        lines = state['lines'] + new_lines
+        dropped, state['lines'] = lines[:-MAX_TAIL_LINES], lines[-MAX_TAIL_LINES:]
+        # Load Older continues before the oldest line still shown
+        state['start'] += sum(len(line.encode('utf-8')) + 1 for line in dropped)
+    st.text_area("Logs", "\n".join(state['lines']), height=300)
+
+@instrument('app.manage_backups')
 def manage_backups():
     st.header("Database Backups")
-    backup_dir = 'backups'
-    os.makedirs(backup_dir, exist_ok=True)
-    backups = sorted(os.listdir(backup_dir), reverse=True)
-
     if st.button("Create Backup"):
-        backup_file = os.path.join(backup_dir, f"cases_backup_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.db")
-        shutil.copy(db.db_file, backup_file)
-        st.success("Backup created")
-        log_action("Backup created", st.session_state['username'])
-    st.write("Available Backups (Last 3):")
-    # Align backup download buttons
-    for backup in backups[:3]:
-        st.write(backup)
-        with open(os.path.join(backup_dir, backup), 'rb') as f:
-            st.download_button(f"Download {backup}", f, file_name=backup)
-    # Delete backups older than 3 days
-    for backup in backups:
-        backup_path = os.path.join(backup_dir, backup)
-        if os.path.isfile(backup_path):
-            creation_time = os.path.getctime(backup_path)
-            if (datetime.datetime.now() - datetime.datetime.fromtimestamp(creation_time)).days > 3:
-                os.remove(backup_path)
+        change_journal.ship(db)
+        # Copy through SQLite's online backup API on a background thread
+        st.session_state['backup_job'] = db.start_backup(store=backup_store, label='backup')
+        st.session_state['backup_reported'] = False
+        delete_old_backups()
+    # Drawn last, so it also picks up the base backup a restore below starts
+    progress_area = st.container()
+    backup_list()
+    with progress_area:
+        backup_progress()
+
+def backup_list():
+    import pandas as pd
+    with timed('app.manage_backups.snapshots') as sample:
+        snapshots = backup_store.snapshots()
+        sample['rows'] = len(snapshots)
+    if not snapshots:
+        st.write("No backups available")
+        return
+    st.write("Available Backups:")
+    st.dataframe(
+        pd.DataFrame(
+            [(s['id'], s['created'][:19], s['label'], s['size'] / 2**20, s['stored_bytes'] / 2**20) for s in snapshots],
+            columns=['Backup', 'Created', 'Type', 'Size (MiB)', 'New Data Stored (MiB)'],
+        ),
+        hide_index=True,
+        column_config={
+            "Size (MiB)": st.column_config.NumberColumn(format="%.2f"),
+            "New Data Stored (MiB)": st.column_config.NumberColumn(format="%.2f"),
+        }
+    )
+    selected_backup = st.selectbox("Select a backup", [s['id'] for s in snapshots])
+    if st.button("Prepare Download"):
+        # Stream the snapshot out of the store into a scratch file
+        previous = st.session_state.pop('backup_download', None)
+        if previous and os.path.exists(previous[0]):
+            os.remove(previous[0])
+        with timed('app.manage_backups.restore_file'):
+            st.session_state['backup_download'] = (backup_store.restore(selected_backup, scratch_path("backup")), f"{selected_backup}.db")
+    download = st.session_state.get('backup_download')
+    if download and os.path.exists(download[0]):
+        download_file, file_name = download
+        with open(download_file, 'rb') as f:
+            st.download_button(f"Download {file_name}", f, file_name=file_name)
+    apply_backup(selected_backup)
+    recover_to_point()
+
+def backup_progress():
+    # Poll only while a backup is running
+    job = st.session_state.get('backup_job')
+    running = job is not None and not job.done
+    st.fragment(run_every=1 if running else None)(draw_backup_progress)(running)
+
+def draw_backup_progress(polling):
+    job = st.session_state.get('backup_job')
+    if job is None:
+        return
+    if not job.done:
+        st.progress(job.progress, text=f"Creating backup... {job.progress:.0%}")
+    elif polling:
+        # Redraw the page so the finished job is shown without the timer
+        st.rerun()
+    elif job.ok:
+        st.success(f"Backup created: {job.snapshot['id']} (integrity check {job.integrity})")
+        if not st.session_state['backup_reported']:
+            log_action("Backup created", st.session_state['username'])
+            st.session_state['backup_reported'] = True
+    else:
+        st.error(f"Backup failed: {job.error}")
 
-def apply_backup():
-    st.header("Apply Backup")
-    backup_dir = 'backups'
-    backups = sorted(os.listdir(backup_dir), reverse=True)
-    selected_backup = st.selectbox("Select a backup to restore", backups)
+def apply_backup(selected_backup):
     if st.button("Restore Backup"):
-        backup_path = os.path.join(backup_dir, selected_backup)
-        shutil.copy(backup_path, db.db_file)
+        # Stream the snapshot out of the store, then copy it into the live database
+        snapshot_file = backup_store.restore(selected_backup, scratch_path("restore"))
+        try:
+            restore_database(snapshot_file)
+        finally:
+            os.remove(snapshot_file)
         st.success(f"Backup '{selected_backup}' has been restored.")
         log_action(f"Backup '{selected_backup}' restored", st.session_state['username'])
         st.rerun()
 
-async def get_all_cases():
-    cursor = await db.connection.execute("SELECT * FROM cases")
-    cases = await cursor.fetchall()
-    return cases
+def scratch_path(kind):
+    # A fresh name every time: sessions working at once must not share scratch files
+    return backup_store.temp_path(f"{kind}-{uuid.uuid4().hex}.db")
+
+def restore_database(path):
+    # Ship the replaced timeline's last changes, mark where it ends so no
+    # recovery replays across this restore, and start the base later
+    # recoveries replay onto
+    change_journal.ship(db)
+    db.restore(path)
+    change_journal.mark_restore(db)
+    st.session_state['backup_job'] = db.start_backup(store=backup_store, label='base')
+    st.session_state['backup_reported'] = False
+
+def recover_to_point():
+    with st.expander("Point-in-Time Recovery"):
+        coverage = change_journal.coverage(backup_store)
+        if coverage is None:
+            st.write("Create a backup first; recovery replays the change journal from one.")
+            return
+        earliest, latest = coverage
+        st.caption(f"Any moment from {earliest:%Y-%m-%d %H:%M:%S} to {latest:%Y-%m-%d %H:%M:%S} can be recovered.")
+        col1, col2 = st.columns(2)
+        with col1:
+            day = st.date_input("Date", value=latest.date(), min_value=earliest.date(), max_value=latest.date(), key="recover_date")
+        with col2:
+            moment = st.time_input("Time", value=latest.time().replace(microsecond=0), step=60, key="recover_time")
+        when = datetime.datetime.combine(day, moment)
+        if st.button("Recover to This Moment"):
+            target = scratch_path("recover")
+            change_journal.ship(db)
+            try:
+                base, replayed = change_journal.recover(backup_store, when, target)
+                restore_database(target)
+            except RecoveryError as error:
+                st.error(str(error))
+                return
+            finally:
+                if os.path.exists(target):
+                    os.remove(target)
+            st.success(f"Recovered the database as of {when:%Y-%m-%d %H:%M:%S} ({replayed} changes replayed on backup {base}).")
+            log_action(f"Database recovered to {when:%Y-%m-%d %H:%M:%S}", st.session_state['username'])
+
+def diagnostics():
+    import pandas as pd
+    st.header("Diagnostics")
+    budget_status()
+    st.caption(f"Timings for this worker since {datetime.datetime.fromtimestamp(metrics.started):%Y-%m-%d %H:%M:%S}, slowest in total first")
+    summaries = metrics.snapshot()
+    if summaries:
+        st.dataframe(
+            pd.DataFrame(summaries).rename(columns={
+                'name': 'Operation', 'calls': 'Calls', 'errors': 'Errors', 'total_s': 'Total (s)',
+                'mean_ms': 'Mean (ms)', 'p50_ms': 'p50 (ms)', 'p95_ms': 'p95 (ms)', 'p99_ms': 'p99 (ms)', 'rows': 'Rows',
+            }),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                column: st.column_config.NumberColumn(format="%.2f")
+                for column in ['Total (s)', 'Mean (ms)', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)']
+            },
+        )
+    else:
+        st.write("No timings recorded yet")
+    # Only present when the database runs in this process, not behind the case service
+    cache = getattr(db, 'cache', None)
+    if cache is not None:
+        st.write("Query cache:", cache.stats())
+    if search_service is not None:
+        st.write("Case search:", search_service.stats())
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Download Prometheus Metrics", metrics.prometheus(), file_name="metrics.txt", mime="text/plain")
+    with col2:
+        if st.button("Reset Timings"):
+            metrics.reset()
+            st.rerun()
 
-async def update_cases(df):
-    await db.connection.execute("DELETE FROM cases")
-    await db.connection.commit()
-    for index, row in df.iterrows():
-        await db.add_case(row['District'], row['Case Number'], row['Party Name'], row['Status'])
+def budget_status():
+    summaries = {summary['name']: summary for summary in metrics.snapshot()}
+    col1, col2 = st.columns(2)
+    for column, name, label, budget in [
+        (col1, 'app.cold_start', "Cold start", COLD_START_BUDGET),
+        (col2, 'app.script', "Rerun (p95)", RERUN_BUDGET),
+    ]:
+        summary = summaries.get(name)
+        with column:
+            if summary is None:
+                st.metric(label, "n/a")
+                continue
+            seconds = summary['p95_ms'] / 1000 if name == 'app.script' else summary['total_s']
+            st.metric(label, f"{seconds:.2f} s", f"budget {budget:.2f} s", delta_color="off")
+            if seconds > budget:
+                st.warning(f"{label} is over its {budget:.2f} s budget")
+
+def fetch_page(key, filters=None, fetch=None):
+    # Keyset pagination: session state keeps the stack of page cursors for this view
+    state = st.session_state.setdefault(key, {'filters': filters, 'cursors': [None]})
+    if state['filters'] != filters:
+        state.update(filters=filters, cursors=[None], page=None)
+    if fetch is None:
+        rows = sync_case_page(state)
+    else:
+        rows = fetch(state['cursors'][-1], PAGE_SIZE + 1, filters)
+    return rows[:PAGE_SIZE], len(rows) > PAGE_SIZE
+
+def sync_case_page(state):
+    # Keep the page with the data version it was read at and patch it with
+    # the changes since, re-querying only when they could move rows between pages
+    cursor = state['cursors'][-1]
+    page = state.get('page')
+    if page and page['cursor'] == cursor:
+        changes = db.changes_since(page['version'])
+        if patch_page(page, changes, state['filters']):
+            return page['rows']
+    # Read the version first, so changes made during the query show up next time
+    version = db.data_version()
+    state['page'] = {'cursor': cursor, 'version': version, 'rows': db.get_cases_page(cursor, PAGE_SIZE + 1, state['filters'])}
+    return state['page']['rows']
+
+def patch_page(page, changes, filters):
+    if changes['version'] == page['version']:
+        return True
+    if changes['reset'] or filters:
+        return False
+    positions = {row[0]: index for index, row in enumerate(page['rows'])}
+    if any(serial_number in positions for serial_number in changes['deleted']):
+        return False
+    rows = list(page['rows'])
+    lowest = rows[-1][0] if rows else 0
+    for row in changes['upserted']:
+        if row[0] in positions:
+            rows[positions[row[0]]] = tuple(row)
+        elif row[0] > lowest and (page['cursor'] is None or row[0] < page['cursor']):
+            # A new case inside this page's range
+            return False
+    page.update(rows=rows, version=changes['version'])
+    return True
+
+def facet_buttons(label, key, counts, selected):
+    # The active value and the most common others; clicking the active one clears it
+    def toggle(value):
+        selected[key] = None if selected[key] == value else value
+
+    shown = [(value, cases) for value, cases in counts if value][:FACET_VALUES]
+    if selected[key] and all(value != selected[key] for value, _ in shown):
+        shown.insert(0, (selected[key], 0))
+    st.caption(label)
+    columns = st.columns(FACET_COLUMNS)
+    for index, (value, cases) in enumerate(shown):
+        with columns[index % FACET_COLUMNS]:
+            st.button(
+                f"{value} ({cases})",
+                key=f"facet_{key}_{value}",
+                on_click=toggle,
+                args=(value,),
+                type="primary" if selected[key] == value else "secondary",
+                use_container_width=True,
+            )
+
+def facet_columns(facets, selected):
+    col1, col2 = st.columns(2)
+    with col1:
+        facet_buttons("District", 'district', facets['district'], selected)
+    with col2:
+        facet_buttons("Status", 'status', facets['status'], selected)
+
+def search_page(after_serial, limit, filters):
+    return search_result(start_search(
+        'page', (after_serial, limit, filters),
+        lambda session: search_service.submit(session, filters['query'], after_serial, limit, filters),
+    ))
+
+def start_search(name, request, submit):
+    # Rerunning the script to draw the same results must not search again,
+    # unless the data changed since
+    searches = st.session_state.setdefault('searches', {})
+    request = (request, db.data_version())
+    if searches.get(name, {}).get('request') != request:
+        session = st.session_state.setdefault('search_session', uuid.uuid4().hex)
+        searches[name] = {'request': request, 'future': submit(session)}
+    return searches[name]['future']
+
+def search_result(future):
+    placeholder = st.empty()
+    # Every update gives Streamlit a chance to stop this run for newer input,
+    # whose search then supersedes this one instead of waiting behind it
+    while not future.done():
+        placeholder.caption("Searching...")
+        time.sleep(0.05)
+    placeholder.empty()
+    return future.result()
+
+def page_controls(key, cases, has_next):
+    state = st.session_state[key]
+
+    def previous_page():
+        state['cursors'].pop()
+
+    def next_page():
+        state['cursors'].append(cases[-1][0])
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("Previous", key=f"{key}_previous", on_click=previous_page, disabled=len(state['cursors']) == 1)
+    with col2:
+        st.caption(f"Page {len(state['cursors'])}")
+    with col3:
+        st.button("Next", key=f"{key}_next", on_click=next_page, disabled=not has_next)
+
+def diff_cases(original_df, edited_df):
+    # Compare the editor output with the rows it was given, keyed by serial number
+    def rows(df):
+        df = df.astype(object).where(df.notna(), None)
+        return [(row[0], tuple(row[1:])) for row in df.itertuples(index=False)]
+
+    original = {int(serial_number): values for serial_number, values in rows(original_df)}
+    added, edited, kept = [], [], set()
+    for serial_number, values in rows(edited_df):
+        if serial_number is None:
+            added.append(values)
+            continue
+        serial_number = int(serial_number)
+        kept.add(serial_number)
+        if original.get(serial_number) != values:
+            edited.append(values + (serial_number,))
+    deleted = [serial_number for serial_number in original if serial_number not in kept]
+    return added, edited, deleted
 
 def increment_change_counter():
     # Increment the change counter
@@ -350,161 +926,30 @@ def increment_change_counter():
         st.session_state['change_count'] = 0  # Reset counter
 
 def create_backup():
-    backup_dir = 'backups'
-    os.makedirs(backup_dir, exist_ok=True)
-    backup_file = os.path.join(backup_dir, f"cases_autobackup_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.db")
-    shutil.copy(db.db_file, backup_file)
-    st.info("An automatic backup has been created.")
+    # Ship the changes since the last backup; a full snapshot is only taken once per interval
+    shipped = change_journal.ship(db)
+    snapshots = backup_store.snapshots()
+    if not snapshots or datetime.datetime.now() - datetime.datetime.fromisoformat(snapshots[0]['created']) > BASE_SNAPSHOT_INTERVAL:
+        db.start_backup(store=backup_store, label='auto')
+        st.info("An automatic backup has been started.")
+    else:
+        st.info(f"{shipped} changes saved to the backup journal.")
     log_action("Automatic backup created", st.session_state['username'])
-    # Delete backups older than 3 days
     delete_old_backups()
 
 def delete_old_backups():
+    # Thin out snapshots with the store's retention policy, then the journal segments no base needs
+    backup_store.prune()
+    change_journal.prune(backup_store)
+    # Remove full-copy backups from before the snapshot store once they are 3 days old
     backup_dir = 'backups'
-    backups = os.listdir(backup_dir)
-    for backup in backups:
+    for backup in os.listdir(backup_dir):
         backup_path = os.path.join(backup_dir, backup)
-        if os.path.isfile(backup_path):
+        if os.path.isfile(backup_path) and backup.endswith('.db'):
             creation_time = os.path.getctime(backup_path)
             if (datetime.datetime.now() - datetime.datetime.fromtimestamp(creation_time)).days > 3:
                 os.remove(backup_path)
 
-# Update CSS styles
-st.markdown("""
-    <style>
-    /* Main container styles */
-    .main {
-        padding: 2rem 4rem;  /* Adjusted padding for better alignment */
-    }
-    
-    /* Center containers */
-    .block-container {
-        max-width: 1200px;
-        padding: 2rem 1rem;
-        margin: 0 auto;
-    }
-    
-    /* Dashboard metrics */
-    [data-testid="stMetricValue"] {
-        font-size: 1.8rem;
-        text-align: center;
-    }
-    
-    /* Data editor alignment */
-    .stDataFrame {
-        width: 100% !important;
-    }
-    
-    /* Input fields */
-    .stTextInput > div > div > input {
-        background-color: #2E2E2E;
-        border: 1px solid #444444;
-        color: #FAFAFA;
-        padding: 0.5rem;
-    }
-    
-    /* Buttons */
-    .stButton > button {
-        width: auto;
-        padding: 0.5rem 1rem;
-        background-color: #444444;
-        color: #FAFAFA;
-        display: inline-flex;
-        align-items: center;
-        justify-content: center;
-        gap: 0.5rem;
-    }
-    
-    /* Tabs */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 2rem;
-        justify-content: center;
-    }
-    
-    /* Headers */
-    h1, h2, h3 {
-        text-align: center;
-        margin-bottom: 1.5rem;
-    }
-    
-    /* Containers */
-    [data-testid="column"] {
-        padding: 0 0.5rem;
-    }
-    
-    /* Expanders */
-    .streamlit-expanderHeader {        background-color: #2E2E2E;        border-radius: 4px;    }        /* Remove default padding from containers */
-    .css-1544g2n {
-        padding: 1rem 1rem !important;
-    }
-    
-    /* Adjust padding for mobile */
-    @media (max-width: 768px) {
-        .main {
-            padding: 0.5rem;
-        }
-        .block-container {
-            padding: 1rem 0.5rem;
-        }
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
-# Update CSS styles
-st.markdown("""
-    <style>
-    /* ...existing styles... */
-
-    /* Responsive adjustments */
-    @media (max-width: 768px) {
-        .main {
-            padding: 0.5rem !important;
-        }
-        .block-container {
-            padding: 1rem 0.5rem !important;
-        }
-        /* Adjust font sizes for mobile */
-        h1 {
-            font-size: 2rem;
-        }
-        h2 {
-            font-size: 1.5rem;
-        }
-        h3 {
-            font-size: 1.2rem;
-        }
-        /* Adjust button sizes */
-        .stButton > button {
-            padding: 0.5rem 1rem;
-        }
-    }
-
-    /* Add visual effects */
-    body {
-        scroll-behavior: smooth;
-        background-color: #f5f5f5;
-    }
-    .stButton > button:hover {
-        background-color: #555555;
-        transition: background-color 0.3s ease;
-    }
-    h1, h2, h3 {
-        animation: fadeIn 1s ease-in-out;
-    }
-    @keyframes fadeIn {
-        from { opacity: 0; transform: translateY(-10px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-
-    /* Optimize performance */
-    /* Minimize CSS reflows by grouping selectors */
-    .main, .block-container, .stButton > button, h1, h2, h3 {
-        will-change: auto;
-    }
-
-    </style>
-    """, unsafe_allow_html=True)
-
 def footer():
     st.markdown("""
     <hr style='border-top: 1px solid #FF4B4B;'>
@@ -514,4 +959,7 @@ def footer():
     """, unsafe_allow_html=True)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        record_script_time()
\ No newline at end of file
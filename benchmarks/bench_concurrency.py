@@ -0,0 +1,107 @@
+"""Throughput of concurrent sessions with the default versus the tuned connection profile.
+
+Each worker thread stands in for a Streamlit session with its own SQLite
+connection, mixing indexed lookups with single-row inserts. Run from the
+repository root:
+
+    python -m benchmarks.bench_concurrency --rows 100000 --workers 8 --seconds 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from benchmarks.caseload import DISTRICTS, STATUSES, Caseload
+from modules.dbCon import PRAGMAS, Database
+
+caseload = Caseload()
+random_case = caseload.case
+
+
+def create_default(path, rows):
+    # The schema and settings Database.connect used before the tuned profile.
+    connection = sqlite3.connect(path)
+    connection.execute("""
+        CREATE TABLE cases (
+            serial_number INTEGER PRIMARY KEY AUTOINCREMENT,
+            district TEXT NOT NULL,
+            case_number TEXT NOT NULL,
+            party_name TEXT NOT NULL,
+            status TEXT
+        );
+    """)
+    connection.executemany("INSERT INTO cases (district, case_number, party_name, status) VALUES (?, ?, ?, ?)",
+                           (random_case(i) for i in range(rows)))
+    connection.commit()
+    connection.close()
+
+
+def create_tuned(path, rows):
+    database = Database(path).start()
+    database.add_cases_bulk([random_case(i) for i in range(rows)])
+    database.stop()
+
+
+def worker(path, pragmas, rows, deadline, write_ratio, results):
+    connection = sqlite3.connect(path)
+    for pragma, value in pragmas.items():
+        connection.execute(f"PRAGMA {pragma} = {value}")
+    reads = writes = errors = 0
+    while time.perf_counter() < deadline:
+        try:
+            if random.random() < write_ratio:
+                connection.execute("INSERT INTO cases (district, case_number, party_name, status) VALUES (?, ?, ?, ?)",
+                                   random_case(rows + random.randint(0, 10**6)))
+                connection.commit()
+                writes += 1
+            else:
+                column, value = random.choice([
+                    ('district', random.choice(DISTRICTS)),
+                    ('status', random.choice(STATUSES)),
+                    ('case_number', caseload.case(random.randrange(rows))[1]),
+                ])
+                connection.execute(f"SELECT * FROM cases WHERE {column} = ? ORDER BY serial_number DESC LIMIT 50",
+                                   (value,)).fetchall()
+                reads += 1
+        except sqlite3.OperationalError:
+            errors += 1
+            connection.rollback()
+    connection.close()
+    results.append((reads, writes, errors))
+
+
+def run(label, path, pragmas, args):
+    results = []
+    deadline = time.perf_counter() + args.seconds
+    threads = [threading.Thread(target=worker, args=(path, pragmas, args.rows, deadline, args.write_ratio, results))
+               for _ in range(args.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    reads, writes, errors = (sum(column) for column in zip(*results))
+    print(f"{label:<8} {reads / args.seconds:10.0f} reads/s {writes / args.seconds:8.0f} writes/s {errors:6d} lock errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        default_path = os.path.join(tmp, 'default.db')
+        tuned_path = os.path.join(tmp, 'tuned.db')
+        create_default(default_path, args.rows)
+        create_tuned(tuned_path, args.rows)
+        run('default', default_path, {}, args)
+        run('tuned', tuned_path, PRAGMAS, args)
+
+
+if __name__ == '__main__':
+    main()
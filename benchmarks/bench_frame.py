@@ -0,0 +1,82 @@
+"""Compare loading cases into a DataFrame from row tuples and from column buffers.
+
+Each method runs in a fresh process against the same database, which is
+built once with synthetic cases, and reports wall time and the growth of
+peak resident memory over the process baseline. Run from the repository root:
+
+    python -m benchmarks.bench_frame --rows 1000000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.caseload import Caseload
+
+METHODS = ('tuples', 'columnar', 'columnar_numpy')
+
+
+def load(db_file, method):
+    import pandas as pd
+    from modules.caseExporter import HEADER
+    from modules.caseFrame import _numpy_frame, read_cases_frame
+    from modules.dbCon import Database
+    db = Database(db_file, cache_size=0).start()
+    db.count_cases()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if method == 'tuples':
+        df = pd.DataFrame(db.get_all_cases(), columns=HEADER)
+    elif method == 'columnar':
+        df = read_cases_frame(db)
+    else:
+        df = _numpy_frame(db.iter_cases(None, 50_000))
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result = {
+        'method': method,
+        'rows': len(df),
+        'seconds': elapsed,
+        'peak_growth_mib': (peak - baseline) / 1024,
+        'frame_mib': df.memory_usage(deep=True).sum() / 2**20,
+        'dtypes': {column: str(dtype) for column, dtype in df.dtypes.items()},
+    }
+    db.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--db', help="existing database to load instead of building one")
+    parser.add_argument('--method', choices=METHODS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.method:
+        print(json.dumps(load(args.db, args.method)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = args.db
+        if db_file is None:
+            from modules.dbCon import Database
+            db_file = os.path.join(tmp, 'cases.db')
+            database = Database(db_file).start()
+            for batch in Caseload().batches(args.rows):
+                database.add_cases_bulk(batch)
+            database.stop()
+        for method in METHODS:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_frame', '--db', db_file, '--method', method],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output)
+            print(f"{method:<15} {result['rows']} rows  {result['seconds']:6.2f} s  "
+                  f"peak +{result['peak_growth_mib']:7.1f} MiB  frame {result['frame_mib']:7.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
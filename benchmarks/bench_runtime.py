@@ -0,0 +1,50 @@
+"""Per-call overhead of asyncio.run per query versus the persistent database loop.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_runtime --calls 2000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from modules.dbCon import Database
+
+
+def time_calls(label, calls, call):
+    start = time.perf_counter()
+    for _ in range(calls):
+        call()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / calls * 1e6:10.1f} us/call")
+
+
+async def open_database(db_file):
+    database = Database(db_file)
+    await database.connect()
+    await database.add_case('Lucknow', 'CR-1/2024', 'Ram Kushwaha', 'Active')
+    return database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before: the connection is opened under one loop and every call spins up another.
+        before = asyncio.run(open_database(os.path.join(tmp, 'before.db')))
+        time_calls("asyncio.run per call", args.calls, lambda: asyncio.run(before.get_case(1)))
+        asyncio.run(before.close())
+
+        # After: one background loop owned by the Database, reached through the facade.
+        after = Database(os.path.join(tmp, 'after.db')).start()
+        after.add_case('Lucknow', 'CR-1/2024', 'Ram Kushwaha', 'Active')
+        time_calls("persistent loop (facade)", args.calls, lambda: after.get_case(1))
+        after.stop()
+
+
+if __name__ == '__main__':
+    main()
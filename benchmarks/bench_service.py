@@ -0,0 +1,81 @@
+"""Read throughput through the case service as the number of worker processes grows.
+
+Starts a case service on a synthetic database, then runs 1, 2, 4, ... client
+processes that each stand in for a Streamlit worker paging through cases.
+The query cache is disabled so every read reaches SQLite. Run from the
+repository root:
+
+    python -m benchmarks.bench_service --rows 100000 --readers 8 --max-workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.caseload import DISTRICTS, STATUSES, Caseload
+from modules.caseService import RemoteDatabase
+from modules.dbCon import Database
+
+
+def client(address, rows, seconds, counts):
+    db = RemoteDatabase(address)
+    deadline = time.perf_counter() + seconds
+    reads = 0
+    while time.perf_counter() < deadline:
+        filters = {'district': random.choice(DISTRICTS), 'status': random.choice(STATUSES)}
+        db.get_cases_page(random.randrange(rows), 50, filters)
+        reads += 1
+    counts.put(reads)
+
+
+def run(address, workers, args):
+    counts = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=client, args=(address, args.rows, args.seconds, counts))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    total = sum(counts.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return total / args.seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--max-workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'cases.db')
+        address = f"unix:{os.path.join(tmp, 'service.sock')}"
+        database = Database(db_file).start()
+        for batch in Caseload().batches(args.rows):
+            database.add_cases_bulk(batch)
+        database.stop()
+
+        service = subprocess.Popen([sys.executable, '-m', 'modules.caseService', '--db', db_file,
+                                    '--address', address, '--readers', str(args.readers), '--cache-size', '0'])
+        try:
+            while not os.path.exists(address[len('unix:'):]):
+                time.sleep(0.1)
+            baseline = None
+            workers = 1
+            while workers <= args.max_workers:
+                throughput = run(address, workers, args)
+                baseline = baseline or throughput
+                print(f"{workers:3d} workers {throughput:10.0f} reads/s  {throughput / baseline:5.2f}x")
+                workers *= 2
+        finally:
+            service.terminate()
+            service.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Synthetic caseloads with realistic district, party-name and status distributions.
+
+Districts and names are drawn with Zipf-like weights, so a few large
+districts and common surnames dominate the way they do in real court lists.
+A fixed seed makes every run generate the same caseload.
+"""
+import random
+
+DISTRICTS = [
+    'Lucknow', 'Kanpur Nagar', 'Prayagraj', 'Varanasi', 'Agra', 'Ghaziabad', 'Meerut', 'Gorakhpur',
+    'Bareilly', 'Aligarh', 'Moradabad', 'Saharanpur', 'Jhansi', 'Ayodhya', 'Mathura', 'Firozabad',
+    'Muzaffarnagar', 'Shahjahanpur', 'Rampur', 'Mirzapur', 'Azamgarh', 'Jaunpur', 'Ballia', 'Deoria',
+    'Sultanpur', 'Unnao', 'Rae Bareli', 'Sitapur', 'Hardoi', 'Lakhimpur Kheri', 'Bahraich', 'Gonda',
+    'Basti', 'Etawah', 'Mainpuri', 'Banda', 'Hamirpur', 'Lalitpur', 'Chitrakoot', 'Kushinagar',
+]
+FIRST_NAMES = [
+    'Ram', 'Shyam', 'Sita', 'Geeta', 'Mohan', 'Sohan', 'Rajesh', 'Suresh', 'Ramesh', 'Anil', 'Sunil',
+    'Vijay', 'Ajay', 'Sanjay', 'Pooja', 'Priya', 'Anita', 'Sunita', 'Rakesh', 'Mukesh', 'Dinesh',
+    'Mahesh', 'Ashok', 'Pradeep', 'Manoj', 'Santosh', 'Kamla', 'Shanti', 'Radha', 'Lakshmi',
+]
+SURNAMES = [
+    'Singh', 'Yadav', 'Kumar', 'Verma', 'Gupta', 'Mishra', 'Pandey', 'Tiwari', 'Shukla', 'Srivastava',
+    'Kushwaha', 'Maurya', 'Chauhan', 'Tripathi', 'Dubey', 'Pal', 'Nishad', 'Prajapati', 'Rajput',
+    'Saxena', 'Agarwal', 'Khan', 'Ansari', 'Qureshi', 'Devi', 'Jaiswal', 'Chaurasia', 'Patel',
+]
+STATUSES = ['Active', 'Pending', 'Disposed', 'Closed', 'Adjourned', 'Reserved']
+STATUS_WEIGHTS = [40, 25, 15, 10, 7, 3]
+CASE_TYPES = ['CR', 'CRL', 'CIV', 'WP', 'FA', 'SA', 'MISC']
+
+
+def zipf_weights(count, exponent=1.1):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+class Caseload:
+    """Deterministic generator of ``(district, case_number, party_name, status)`` tuples."""
+
+    def __init__(self, seed=42):
+        self.random = random.Random(seed)
+        self.district_weights = zipf_weights(len(DISTRICTS))
+        self.first_name_weights = zipf_weights(len(FIRST_NAMES), 0.8)
+        self.surname_weights = zipf_weights(len(SURNAMES))
+
+    def district(self):
+        return self.random.choices(DISTRICTS, self.district_weights)[0]
+
+    def party_name(self):
+        first = self.random.choices(FIRST_NAMES, self.first_name_weights)[0]
+        surname = self.random.choices(SURNAMES, self.surname_weights)[0]
+        return f"{first} {surname}"
+
+    def status(self):
+        return self.random.choices(STATUSES, STATUS_WEIGHTS)[0]
+
+    def case(self, number):
+        case_number = f"{self.random.choice(CASE_TYPES)}-{number}/{self.random.randint(2005, 2025)}"
+        return self.district(), case_number, self.party_name(), self.status()
+
+    def cases(self, count, start=0):
+        """Yield ``count`` cases numbered from ``start``."""
+        for number in range(start, start + count):
+            yield self.case(number)
+
+    def batches(self, count, batch_size=50_000):
+        """Yield the caseload as lists of at most ``batch_size`` cases."""
+        for start in range(0, count, batch_size):
+            yield list(self.cases(min(batch_size, count - start), start))
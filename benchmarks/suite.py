@@ -0,0 +1,138 @@
+"""Benchmark suite for the Database layer and the app's data paths.
+
+For each caseload size it builds a synthetic database, times the main
+paths and writes the results as JSON, so runs can be compared between
+releases. The query cache is disabled so every call reaches SQLite. Run
+from the repository root:
+
+    python -m benchmarks.suite --sizes 10000 100000 1000000 --output bench.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+
+from benchmarks.caseload import DISTRICTS, STATUSES, SURNAMES, Caseload
+from modules.backupStore import BackupStore
+from modules.dbCon import Database
+
+
+def measure(call, repeat):
+    """Time ``repeat`` calls and summarize the latencies in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'calls': repeat,
+        'mean_ms': statistics.fmean(timings),
+        'p50_ms': timings[len(timings) // 2],
+        'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'max_ms': timings[-1],
+    }
+
+
+def build(db_file, size):
+    """Create a database holding ``size`` synthetic cases; returns the seconds it took."""
+    start = time.perf_counter()
+    db = Database(db_file, cache_size=0).start()
+    for batch in Caseload().batches(size):
+        db.add_cases_bulk(batch)
+    db.stop()
+    return time.perf_counter() - start
+
+
+def run_size(size, repeat, tmp):
+    db_file = os.path.join(tmp, f"cases_{size}.db")
+    results = {'build_s': build(db_file, size)}
+    db = Database(db_file, cache_size=0).start()
+    caseload = Caseload(seed=size)
+    pick = random.Random(size)
+
+    def serial():
+        return pick.randint(1, size)
+
+    results['add_case'] = measure(lambda: db.add_case(*caseload.case(size + pick.randrange(10**6))), repeat)
+    results['edit_district'] = measure(lambda: db.edit_district(serial(), pick.choice(DISTRICTS)), repeat)
+    results['edit_case_number'] = measure(lambda: db.edit_case_number(serial(), caseload.case(serial())[1]), repeat)
+    results['edit_party_name'] = measure(lambda: db.edit_party_name(serial(), caseload.party_name()), repeat)
+    results['edit_status'] = measure(lambda: db.edit_status(serial(), pick.choice(STATUSES)), repeat)
+    results['delete_case'] = measure(lambda: db.delete_case(serial()), repeat)
+
+    # Saving the data editor: a one-cell edit and a full page of changes.
+    results['save_one_edit'] = measure(
+        lambda: db.apply_case_changes(edited=[caseload.case(0) + (serial(),)]), repeat)
+    results['save_page_of_edits'] = measure(
+        lambda: db.apply_case_changes(
+            added=list(caseload.cases(10, size)),
+            edited=[caseload.case(0) + (serial(),) for _ in range(30)],
+            deleted=[serial() for _ in range(10)],
+        ), repeat)
+    results['add_cases_bulk_1000'] = measure(lambda: db.add_cases_bulk(list(caseload.cases(1000, size))), max(1, repeat // 10))
+
+    results['search_case_number'] = measure(lambda: db.search_all_fields(caseload.case(serial())[1].split('/')[0], 50), repeat)
+    results['search_surname'] = measure(lambda: db.search_all_fields(pick.choice(SURNAMES), 50), repeat)
+    results['search_short_prefix'] = measure(lambda: db.search_all_fields(pick.choice(SURNAMES)[:2], 50), repeat)
+    results['get_cases_page'] = measure(lambda: db.get_cases_page(serial(), 50), repeat)
+    results['get_cases_page_filtered'] = measure(
+        lambda: db.get_cases_page(None, 50, {'district': pick.choice(DISTRICTS), 'status': pick.choice(STATUSES)}), repeat)
+    results['count_cases'] = measure(db.count_cases, max(1, repeat // 10))
+    results['get_facets'] = measure(lambda: db.get_facets({'status': pick.choice(STATUSES)}), repeat)
+    results['get_dashboard_stats'] = measure(db.get_dashboard_stats, max(1, repeat // 10))
+    results['get_all_cases'] = measure(db.get_all_cases, max(1, repeat // 10))
+
+    store = BackupStore(os.path.join(tmp, f"store_{size}"))
+    results['backup_to_file'] = measure(
+        lambda: db.start_backup(os.path.join(tmp, f"backup_{size}.db")).wait(), max(1, repeat // 10))
+    results['backup_to_store'] = measure(lambda: db.start_backup(store=store).wait(), max(1, repeat // 10))
+    results['db_bytes'] = os.path.getsize(db_file)
+    results['store_bytes'] = store.disk_usage()
+    db.stop()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--output', default='bench_output.json')
+    args = parser.parse_args()
+
+    report = {
+        'revision': git_revision(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'sizes': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            print(f"Benchmarking {size} cases...")
+            report['sizes'][str(size)] = results = run_size(size, args.repeat, tmp)
+            for name, result in results.items():
+                if isinstance(result, dict):
+                    print(f"  {name:<26} p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms")
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+import atexit
+import datetime
+import gzip
+import json
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+
+
+class ActionLog:
+    """Structured audit log with a buffered background writer.
+
+    Entries are appended as JSON lines to ``actions.jsonl`` and indexed in
+    ``actions.db`` for queries by user, action and time. ``record`` only
+    queues the entry; a writer thread flushes queued entries in batches.
+    The JSONL file is rotated into a gzipped archive once it passes
+    ``max_bytes`` or ``max_age`` seconds, while the index keeps every entry.
+    """
+
+    def __init__(self, directory='logs', max_bytes=10 * 1024 * 1024, max_age=24 * 60 * 60,
+                 flush_interval=1.0, batch_size=500):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(directory, 'actions.jsonl')
+        self.index_file = os.path.join(directory, 'actions.db')
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        # The last failed write, if the writer has not caught up since
+        self.error = None
+        connection = self._connect()
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS actions (
+                id INTEGER PRIMARY KEY,
+                ts TEXT NOT NULL,
+                user TEXT,
+                ip TEXT,
+                action TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_actions_user ON actions (user, id);
+            CREATE INDEX IF NOT EXISTS idx_actions_action ON actions (action, id);
+            CREATE INDEX IF NOT EXISTS idx_actions_ts ON actions (ts);
+            -- Users seen so far, so listing them does not scan the whole log
+            CREATE TABLE IF NOT EXISTS action_users (user TEXT PRIMARY KEY);
+            CREATE TRIGGER IF NOT EXISTS actions_user_insert AFTER INSERT ON actions
+            WHEN new.user IS NOT NULL BEGIN
+                INSERT OR IGNORE INTO action_users (user) VALUES (new.user);
+            END;
+            INSERT OR IGNORE INTO action_users (user)
+            SELECT DISTINCT user FROM actions
+            WHERE user IS NOT NULL AND NOT EXISTS (SELECT 1 FROM action_users);
+        """)
+        connection.close()
+        self._thread = threading.Thread(target=self._run, name='action-log', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.index_file, timeout=5)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        return connection
+
+    def record(self, action, user, ip_address='Unknown'):
+        """Queue one entry; it is written on the next flush."""
+        self._queue.put({
+            'ts': datetime.datetime.now().isoformat(sep=' ', timespec='seconds'),
+            'user': user,
+            'ip': ip_address,
+            'action': action,
+        })
+
+    def flush(self, timeout=None):
+        """Block until every entry queued so far has been written."""
+        if not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """Flush outstanding entries and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        connection = self._connect()
+        running = True
+        # Entries not in the JSONL file yet, and entries in it but not indexed yet
+        unlogged, unindexed = [], []
+        while running:
+            waiters = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                while True:
+                    if item is None:
+                        running = False
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        unlogged.append(item)
+                    if len(unlogged) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            if unlogged or unindexed:
+                # A failed step keeps its entries for the next flush; steps
+                # that succeeded are not repeated, so nothing is written twice
+                error = None
+                try:
+                    if unlogged:
+                        self._append(unlogged)
+                        unindexed += unlogged
+                        unlogged = []
+                    with connection:
+                        connection.executemany(
+                            "INSERT INTO actions (ts, user, ip, action) VALUES (:ts, :user, :ip, :action)", unindexed)
+                    unindexed = []
+                except Exception as failed:
+                    error = failed
+                try:
+                    self._rotate_if_needed()
+                except Exception as failed:
+                    # The entries are safe; rotation is simply tried again next time
+                    error = error or failed
+                self.error = error
+            for waiter in waiters:
+                waiter.set()
+        connection.close()
+
+    def _append(self, batch):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry) + '\n' for entry in batch)
+
+    def _rotate_if_needed(self):
+        if not os.path.exists(self.path):
+            return
+        stat = os.stat(self.path)
+        too_old = datetime.datetime.now().timestamp() - _first_entry_time(self.path) > self.max_age
+        if stat.st_size < self.max_bytes and not too_old:
+            return
+        archive = os.path.join(self.directory, f"actions-{datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')}.jsonl.gz")
+        # A rotation cut short must not leave an archive that repeats entries
+        partial = archive + '.partial'
+        try:
+            with open(self.path, 'rb') as source, gzip.open(partial, 'wb') as target:
+                shutil.copyfileobj(source, target)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        os.replace(partial, archive)
+        os.remove(self.path)
+
+    def query(self, before_id=None, limit=50, filters=None):
+        """Get entries newest first as ``(id, ts, user, ip, action)`` tuples.
+
+        ``filters`` may hold ``user``, an ``action`` prefix and ``since`` /
+        ``until`` timestamps; ``before_id`` continues from an earlier page.
+        """
+        conditions, params = [], []
+        filters = filters or {}
+        if filters.get('user'):
+            conditions.append("user = ?")
+            params.append(filters['user'])
+        if filters.get('action'):
+            # A range on the indexed column instead of LIKE, which cannot use it.
+            conditions.append("action >= ? AND action < ?")
+            params += [filters['action'], filters['action'] + '\uffff']
+        if filters.get('since'):
+            conditions.append("ts >= ?")
+            params.append(str(filters['since']))
+        if filters.get('until'):
+            conditions.append("ts < ?")
+            params.append(str(filters['until']))
+        if before_id is not None:
+            conditions.append("id < ?")
+            params.append(before_id)
+        connection = sqlite3.connect(self.index_file, timeout=5)
+        try:
+            return connection.execute(f"""
+                SELECT id, ts, user, ip, action FROM actions
+                WHERE {' AND '.join(conditions) or '1'}
+                ORDER BY id DESC
+                LIMIT ?;
+            """, (*params, limit)).fetchall()
+        finally:
+            connection.close()
+
+    def users(self):
+        """Distinct users that appear in the log."""
+        connection = sqlite3.connect(self.index_file, timeout=5)
+        try:
+            return [row[0] for row in connection.execute("SELECT user FROM action_users ORDER BY user")]
+        finally:
+            connection.close()
+
+
+def _first_entry_time(path):
+    with open(path, encoding='utf-8') as f:
+        first = f.readline()
+    return datetime.datetime.fromisoformat(json.loads(first)['ts']).timestamp()
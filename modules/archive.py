@@ -0,0 +1,59 @@
+import datetime
+import os
+
+# Schema of the archive file, created in the attached ``archive`` schema. Rows
+# keep their serial numbers, so a case can move back unchanged; the trigram
+# index mirrors the hot table's so archive searches match the same way.
+ARCHIVE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS archive.cases (
+        serial_number INTEGER PRIMARY KEY,
+        district TEXT NOT NULL,
+        case_number TEXT NOT NULL,
+        party_name TEXT NOT NULL,
+        status TEXT
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS archive.cases_fts USING fts5(
+        district, case_number, party_name, status,
+        content='cases', content_rowid='serial_number',
+        tokenize='trigram'
+    );
+    CREATE TRIGGER IF NOT EXISTS archive.cases_fts_insert AFTER INSERT ON cases BEGIN
+        INSERT INTO cases_fts(rowid, district, case_number, party_name, status)
+        VALUES (new.serial_number, new.district, new.case_number, new.party_name, new.status);
+    END;
+    CREATE TRIGGER IF NOT EXISTS archive.cases_fts_delete AFTER DELETE ON cases BEGIN
+        INSERT INTO cases_fts(cases_fts, rowid, district, case_number, party_name, status)
+        VALUES ('delete', old.serial_number, old.district, old.case_number, old.party_name, old.status);
+    END;
+"""
+
+
+def archive_path(db_file):
+    """Default archive file next to ``db_file``: ``db/data.db`` archives to ``db/data.archive.db``."""
+    root, ext = os.path.splitext(db_file)
+    return f"{root}.archive{ext or '.db'}"
+
+
+class ArchivePolicy:
+    """Which cases move to the archive, and how often and in what batches.
+
+    A case is archived once its status is one of ``statuses`` (any case)
+    and it has not changed for ``min_age_days``. Each batch of
+    ``batch_size`` cases moves in its own transaction, so writers are only
+    held up briefly; ``interval`` is the seconds between scheduled runs.
+    """
+
+    def __init__(self, statuses=('Closed', 'Disposed'), min_age_days=365, batch_size=1000, interval=24 * 3600):
+        self.statuses = statuses
+        self.min_age_days = min_age_days
+        self.batch_size = batch_size
+        self.interval = interval
+
+    def status_values(self):
+        """Spellings of the archived statuses to match, so the status index can be used."""
+        return sorted({form for status in self.statuses for form in (status, status.lower(), status.title(), status.upper())})
+
+    def cutoff(self, now=None):
+        """Cases last changed before this UTC timestamp are old enough to archive."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        return (now - datetime.timedelta(days=self.min_age_days)).strftime('%Y-%m-%d %H:%M:%S')
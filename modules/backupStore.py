@@ -0,0 +1,181 @@
+import datetime
+import hashlib
+import json
+import os
+import threading
+import zlib
+
+CHUNK_SIZE = 256 * 1024  # a multiple of SQLite's page size, so page edits stay chunk-local
+
+
+class RetentionPolicy:
+    """Grandfather-father-son retention for backup snapshots.
+
+    Keeps the newest ``last`` snapshots plus the newest snapshot in each of
+    the most recent ``hourly`` hours, ``daily`` days and ``weekly`` ISO weeks
+    that have one.
+    """
+
+    def __init__(self, last=3, hourly=24, daily=7, weekly=4):
+        self.last = last
+        self.hourly = hourly
+        self.daily = daily
+        self.weekly = weekly
+
+    def keep(self, snapshots):
+        """Return the ids of the snapshots to keep from a newest-first list."""
+        keep = {snapshot['id'] for snapshot in snapshots[:self.last]}
+        for count, bucket_format in ((self.hourly, '%Y%m%d%H'), (self.daily, '%Y%m%d'), (self.weekly, '%G%V')):
+            buckets = set()
+            for snapshot in snapshots:
+                bucket = datetime.datetime.fromisoformat(snapshot['created']).strftime(bucket_format)
+                if bucket in buckets:
+                    continue
+                if len(buckets) == count:
+                    break
+                buckets.add(bucket)
+                keep.add(snapshot['id'])
+        return keep
+
+
+class BackupStore:
+    """Compressed, deduplicated store of database snapshots.
+
+    Snapshots are split into fixed-size chunks that are stored once each,
+    zlib-compressed and named by their SHA-256, so unchanged parts of the
+    database cost nothing in later snapshots. A JSON manifest per snapshot
+    lists its chunks in order.
+    """
+
+    def __init__(self, root='backups', chunk_size=CHUNK_SIZE, policy=None):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.policy = policy or RetentionPolicy()
+        self.chunk_dir = os.path.join(root, 'chunks')
+        self.snapshot_dir = os.path.join(root, 'snapshots')
+        self.tmp_dir = os.path.join(root, 'tmp')
+        for directory in (self.chunk_dir, self.snapshot_dir, self.tmp_dir):
+            os.makedirs(directory, exist_ok=True)
+        # Held while adding or pruning so garbage collection never removes a
+        # chunk that a snapshot being written is about to reference.
+        self._lock = threading.Lock()
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunk_dir, digest[:2], digest + '.z')
+
+    def _manifest_path(self, snapshot_id):
+        return os.path.join(self.snapshot_dir, snapshot_id + '.json')
+
+    def temp_path(self, name):
+        """Path for a scratch file inside the store, on the same filesystem as the chunks."""
+        return os.path.join(self.tmp_dir, name)
+
+    def add(self, path, label='manual', meta=None):
+        """Store the database file at ``path`` as a new snapshot and return its manifest.
+
+        ``meta`` adds extra fields to the manifest.
+        """
+        created = datetime.datetime.now()
+        snapshot_id = f"{created.strftime('%Y%m%d%H%M%S%f')}_{label}"
+        chunks, size, new_bytes = [], 0, 0
+        file_hash = hashlib.sha256()
+        with self._lock:
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(self.chunk_size), b''):
+                    digest = hashlib.sha256(block).hexdigest()
+                    file_hash.update(block)
+                    size += len(block)
+                    chunks.append(digest)
+                    chunk_path = self._chunk_path(digest)
+                    if not os.path.exists(chunk_path):
+                        data = zlib.compress(block, 6)
+                        _write_atomic(chunk_path, data)
+                        new_bytes += len(data)
+            manifest = {
+                'id': snapshot_id,
+                'label': label,
+                'created': created.isoformat(),
+                'size': size,
+                'stored_bytes': new_bytes,
+                'sha256': file_hash.hexdigest(),
+                'chunks': chunks,
+                **(meta or {}),
+            }
+            _write_atomic(self._manifest_path(snapshot_id), json.dumps(manifest).encode())
+        return manifest
+
+    def snapshots(self):
+        """List snapshot manifests, newest first."""
+        manifests = []
+        for name in os.listdir(self.snapshot_dir):
+            if name.endswith('.json'):
+                with open(os.path.join(self.snapshot_dir, name)) as f:
+                    manifests.append(json.load(f))
+        return sorted(manifests, key=lambda manifest: manifest['created'], reverse=True)
+
+    def get(self, snapshot_id):
+        """Load the manifest of one snapshot."""
+        with open(self._manifest_path(snapshot_id)) as f:
+            return json.load(f)
+
+    def iter_chunks(self, snapshot_id):
+        """Yield the decompressed bytes of a snapshot one chunk at a time."""
+        for digest in self.get(snapshot_id)['chunks']:
+            with open(self._chunk_path(digest), 'rb') as f:
+                yield zlib.decompress(f.read())
+
+    def restore(self, snapshot_id, target):
+        """Stream a snapshot into ``target``, verifying its checksum before it is moved into place."""
+        manifest = self.get(snapshot_id)
+        partial = target + '.partial'
+        file_hash = hashlib.sha256()
+        try:
+            with open(partial, 'wb') as f:
+                for block in self.iter_chunks(snapshot_id):
+                    file_hash.update(block)
+                    f.write(block)
+            if file_hash.hexdigest() != manifest['sha256']:
+                raise ValueError(f"Snapshot {snapshot_id} is corrupt: checksum mismatch")
+            os.replace(partial, target)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        return target
+
+    def delete(self, snapshot_id):
+        """Remove a snapshot manifest; its chunks are reclaimed by ``prune``."""
+        os.remove(self._manifest_path(snapshot_id))
+
+    def prune(self):
+        """Apply the retention policy, then delete chunks no snapshot references.
+
+        Returns the ids of the snapshots that were removed.
+        """
+        with self._lock:
+            snapshots = self.snapshots()
+            keep = self.policy.keep(snapshots)
+            removed = [snapshot['id'] for snapshot in snapshots if snapshot['id'] not in keep]
+            for snapshot_id in removed:
+                self.delete(snapshot_id)
+            referenced = {digest for snapshot in snapshots if snapshot['id'] in keep for digest in snapshot['chunks']}
+            for directory, _, files in os.walk(self.chunk_dir):
+                for name in files:
+                    if name[:-len('.z')] not in referenced:
+                        os.remove(os.path.join(directory, name))
+        return removed
+
+    def disk_usage(self):
+        """Total bytes used by stored chunks."""
+        return sum(
+            os.path.getsize(os.path.join(directory, name))
+            for directory, _, files in os.walk(self.chunk_dir)
+            for name in files
+        )
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{threading.get_ident()}.partial"
+    with open(partial, 'wb') as f:
+        f.write(data)
+    os.replace(partial, path)
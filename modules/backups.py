@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import threading
+
+
+class BackupError(Exception):
+    """Raised when a backup snapshot fails its integrity check."""
+
+
+class _SourceKeepsChanging(Exception):
+    """Aborts a stepped copy that keeps restarting because the source is being written."""
+
+
+class BackupJob:
+    """Online backup of a live SQLite database, copied in page steps on a background thread.
+
+    Writers can commit between steps, so the application keeps running
+    while the backup is taken. The snapshot is written next to ``target``
+    and only moved into place after ``PRAGMA integrity_check`` passes.
+
+    With a ``store``, the verified snapshot is added to that
+    :class:`~modules.backupStore.BackupStore` under ``label`` instead of being
+    kept at ``target``; its manifest is then available as ``snapshot``. The
+    manifest's ``journal_seq`` is the last change journal entry the snapshot
+    contains, where a point-in-time recovery starts replaying.
+
+    SQLite restarts a stepped copy whenever another connection writes to the
+    source. After ``max_restarts`` restarts the job finishes in a single
+    pass instead, which holds one read transaction for the remaining copy.
+    """
+
+    def __init__(self, source, target=None, pages=256, pause=0.005, max_restarts=3, store=None, label='manual'):
+        self.source = source
+        self.store = store
+        self.label = label
+        if target is None:
+            target = store.temp_path(f"{label}_{id(self)}.db")
+        self.target = target
+        self.snapshot = None
+        self.pages = pages
+        self.pause = pause
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self.total = None
+        self.remaining = None
+        self.integrity = None
+        self.journal_seq = None
+        self.error = None
+        self.done = False
+        self._thread = threading.Thread(target=self._run, name='backup-job', daemon=True)
+
+    def start(self):
+        """Start copying in the background and return the job."""
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Block until the backup finishes or ``timeout`` seconds pass."""
+        self._thread.join(timeout)
+        return self
+
+    @property
+    def progress(self):
+        """Fraction of pages copied so far, from 0.0 to 1.0."""
+        if self.done:
+            return 1.0
+        if not self.total:
+            return 0.0
+        return (self.total - self.remaining) / self.total
+
+    @property
+    def ok(self):
+        """Whether the backup finished and passed its integrity check."""
+        return self.done and self.error is None
+
+    def _progress(self, status, remaining, total):
+        if self.remaining is not None and remaining > self.remaining:
+            self.restarts += 1
+            if self.restarts > self.max_restarts:
+                raise _SourceKeepsChanging
+        self.remaining = remaining
+        self.total = total
+
+    def _run(self):
+        partial = self.target + '.partial'
+        try:
+            os.makedirs(os.path.dirname(self.target) or '.', exist_ok=True)
+            source = sqlite3.connect(self.source)
+            target = sqlite3.connect(partial)
+            try:
+                try:
+                    source.backup(target, pages=self.pages, progress=self._progress, sleep=self.pause)
+                except _SourceKeepsChanging:
+                    source.backup(target)
+                self.integrity = target.execute("PRAGMA integrity_check").fetchone()[0]
+                row = target.execute("SELECT seq FROM sqlite_sequence WHERE name = 'case_journal'").fetchone()
+                self.journal_seq = row[0] if row else 0
+            finally:
+                target.close()
+                source.close()
+            if self.integrity != 'ok':
+                raise BackupError(f"Integrity check failed: {self.integrity}")
+            os.replace(partial, self.target)
+            if self.store is not None:
+                self.snapshot = self.store.add(self.target, self.label, {'journal_seq': self.journal_seq})
+                os.remove(self.target)
+        except Exception as error:
+            self.error = error
+            if os.path.exists(partial):
+                os.remove(partial)
+        finally:
+            self.done = True
@@ -0,0 +1,54 @@
+import csv
+
+HEADER = ['Serial Number', 'District', 'Case Number', 'Party Name', 'Status']
+
+
+def write_csv(batches, path):
+    """Write batches of case rows to a CSV file as they arrive; returns the row count."""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for rows in batches:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def write_parquet(batches, path):
+    """Write batches of case rows to a Parquet file, one row group per batch; returns the row count."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError("Exporting Parquet requires pyarrow: pip install pyarrow") from error
+    schema = pa.schema([
+        ('Serial Number', pa.int64()),
+        ('District', pa.string()),
+        ('Case Number', pa.string()),
+        ('Party Name', pa.string()),
+        ('Status', pa.string()),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in batches:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays([pa.array(column, field.type) for column, field in zip(columns, schema)], schema=schema))
+            count += len(rows)
+    return count
+
+
+WRITERS = {
+    'csv': write_csv,
+    'parquet': write_parquet,
+}
+
+
+def export_cases(db, path, fmt='csv', filters=None, batch_size=5000):
+    """Stream the cases matching ``filters`` from ``db`` into a CSV or Parquet file at ``path``.
+
+    ``db`` is the blocking facade returned by ``Database.start()``; rows are
+    fetched from a single cursor ``batch_size`` at a time and written
+    immediately, so the full result set is never held in memory.
+    """
+    return WRITERS[fmt](db.iter_cases(filters, batch_size), path)
@@ -0,0 +1,70 @@
+from modules.caseExporter import HEADER
+
+# Low-cardinality columns stored as categoricals: one small integer code per row.
+CATEGORICAL = ('District', 'Status')
+
+
+def read_cases_frame(db, filters=None, batch_size=50_000):
+    """Load the cases matching ``filters`` into a DataFrame, newest first, column by column.
+
+    Rows stream from ``db.iter_cases`` and each batch is moved into typed
+    column buffers straight away, so only one batch of row tuples is alive
+    at a time instead of the whole result. Serial numbers become int64,
+    district and status categoricals, and case number and party name
+    Arrow strings when pyarrow is installed (object columns otherwise).
+    """
+    try:
+        import pyarrow
+    except ImportError:
+        return _numpy_frame(db.iter_cases(filters, batch_size))
+    return _arrow_frame(db.iter_cases(filters, batch_size), pyarrow)
+
+
+def _arrow_frame(batches, pa):
+    import pandas as pd
+    schema = pa.schema([
+        (HEADER[0], pa.int64()),
+        *((name, pa.dictionary(pa.int32(), pa.string()) if name in CATEGORICAL else pa.string()) for name in HEADER[1:]),
+    ])
+    record_batches = []
+    for rows in batches:
+        columns = zip(*rows)
+        arrays = []
+        for column, field in zip(columns, schema):
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(column, pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(column, field.type))
+        record_batches.append(pa.RecordBatch.from_arrays(arrays, schema=schema))
+    table = pa.Table.from_batches(record_batches, schema=schema).unify_dictionaries()
+    del record_batches
+    return table.to_pandas(
+        self_destruct=True,
+        split_blocks=True,
+        types_mapper=lambda arrow_type: pd.StringDtype('pyarrow') if arrow_type == pa.string() else None,
+    )
+
+
+def _numpy_frame(batches):
+    import numpy as np
+    import pandas as pd
+    serials, objects, codes = [], {name: [] for name in HEADER[1:]}, {}
+    categories = {name: {} for name in CATEGORICAL}
+    for rows in batches:
+        columns = dict(zip(HEADER, zip(*rows)))
+        serials.append(np.fromiter(columns.pop(HEADER[0]), np.int64))
+        for name, column in columns.items():
+            if name in CATEGORICAL:
+                lookup = categories[name]
+                codes.setdefault(name, []).append(np.fromiter(
+                    (-1 if value is None else lookup.setdefault(value, len(lookup)) for value in column), np.int32, len(column)))
+            else:
+                objects[name].append(np.array(column, dtype=object))
+    data = {HEADER[0]: np.concatenate(serials) if serials else np.empty(0, np.int64)}
+    for name in HEADER[1:]:
+        if name in CATEGORICAL:
+            chunks = codes.get(name) or [np.empty(0, np.int32)]
+            data[name] = pd.Categorical.from_codes(np.concatenate(chunks), list(categories[name]))
+        else:
+            data[name] = np.concatenate(objects[name]) if objects[name] else np.empty(0, object)
+    return pd.DataFrame(data, columns=HEADER)
@@ -0,0 +1,159 @@
+import csv
+import io
+import re
+
+# Accepted spellings of each column header, compared case-insensitively
+# with spaces, dashes and underscores ignored.
+COLUMNS = {
+    'district': ('district',),
+    'case_number': ('casenumber', 'caseno', 'case'),
+    'party_name': ('partyname', 'party', 'name'),
+    'status': ('status', 'casestatus'),
+}
+
+# Spellings of the common statuses, normalized to the one the app displays.
+STATUSES = {
+    'active': 'Active',
+    'open': 'Active',
+    'pending': 'Pending',
+    'disposed': 'Disposed',
+    'disposed off': 'Disposed',
+    'closed': 'Closed',
+}
+
+
+class ImportReport:
+    """Counts and per-row errors from one import run.
+
+    Only the first ``max_errors`` errors are kept, so memory stays bounded
+    however bad the file is; ``error_count`` has the true total.
+    """
+
+    def __init__(self, max_errors=1000):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+
+def _collapse(value):
+    return re.sub(r'\s+', ' ', str(value)).strip() if value is not None else ''
+
+
+def normalize_case(row):
+    """Validate one imported row and return ``(district, case_number, party_name, status)``.
+
+    Raises ValueError with a readable message when a row cannot be imported.
+    """
+    district = _collapse(row.get('district')).title()
+    case_number = re.sub(r'\s*([/-])\s*', r'\1', _collapse(row.get('case_number'))).upper()
+    party_name = _collapse(row.get('party_name'))
+    status = _collapse(row.get('status'))
+    missing = [label for label, value in (('district', district), ('case number', case_number), ('party name', party_name)) if not value]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+    if not any(character.isdigit() for character in case_number):
+        raise ValueError(f"Case number {case_number!r} has no digits")
+    status = STATUSES.get(status.lower(), status.title()) if status else None
+    return district, case_number, party_name, status
+
+
+def _map_header(header):
+    keys = {}
+    for position, name in enumerate(header):
+        name = re.sub(r'[\s_-]', '', str(name or '')).lower()
+        for column, spellings in COLUMNS.items():
+            if name in spellings and column not in keys.values():
+                keys[position] = column
+    missing = {'district', 'case_number', 'party_name'} - set(keys.values())
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+    return keys
+
+
+def read_csv(file):
+    """Yield ``(line_number, row_dict, fraction_read)`` from a binary CSV file, one row at a time."""
+    size = _size(file)
+    reader = csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    keys = _map_header(next(reader, []))
+    for values in reader:
+        if any(values):
+            row = {column: values[position] for position, column in keys.items() if position < len(values)}
+            yield reader.line_num, row, (file.tell() / size if size else None)
+
+
+def read_xlsx(file):
+    """Yield ``(line_number, row_dict, fraction_read)`` from the first sheet of a binary XLSX file."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError as error:
+        raise ImportError("Importing .xlsx files requires openpyxl: pip install openpyxl") from error
+    # Read-only mode streams rows from the zipped sheet instead of loading it.
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total = sheet.max_row
+        rows = sheet.iter_rows(values_only=True)
+        keys = _map_header(next(rows, ()))
+        for line, values in enumerate(rows, start=2):
+            if any(value not in (None, '') for value in values):
+                row = {column: values[position] for position, column in keys.items() if position < len(values)}
+                yield line, row, (line / total if total else None)
+    finally:
+        workbook.close()
+
+
+def _size(file):
+    try:
+        position = file.tell()
+        file.seek(0, io.SEEK_END)
+        size = file.tell()
+        file.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+def import_cases(db, file, kind='csv', batch_size=1000, progress=None, max_errors=1000):
+    """Stream cases from a CSV or XLSX file into the database in batched upserts.
+
+    ``db`` is the blocking facade returned by ``Database.start()``. Rows are
+    parsed in the calling thread and written one batch per transaction, so
+    memory use depends on ``batch_size`` and not on the size of the file.
+    ``progress`` is called after each batch with the report and the fraction
+    of the file read so far (``None`` when unknown).
+    """
+    report = ImportReport(max_errors)
+    reader = read_xlsx if kind == 'xlsx' else read_csv
+    batch, fraction, line = [], None, 1
+
+    def flush():
+        inserted, updated = db.upsert_cases_bulk(batch)
+        report.inserted += inserted
+        report.updated += updated
+        batch.clear()
+        if progress:
+            progress(report, fraction)
+
+    try:
+        for line, row, fraction in reader(file):
+            report.rows += 1
+            try:
+                batch.append(normalize_case(row))
+            except ValueError as error:
+                report.add_error(line, str(error))
+            if len(batch) >= batch_size:
+                flush()
+    except (ValueError, csv.Error) as error:
+        # A bad header, encoding or quoting stops the import at this line.
+        report.add_error(line, f"Import stopped: {error}")
+    if batch:
+        flush()
+    return report
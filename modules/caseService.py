@@ -0,0 +1,216 @@
+"""Local case service: one process owns the database and Streamlit workers call it.
+
+Run it next to the app and point the workers at it:
+
+    python -m modules.caseService --db db/data.db --address unix:/tmp/case-service.sock --readers 4
+    CASE_SERVICE_ADDRESS=unix:/tmp/case-service.sock streamlit run app.py
+
+The service holds the single writer connection and a pool of read-only
+connections, so any number of workers can read in parallel while writes
+are serialized in one place. Requests and responses are JSON lines.
+"""
+import argparse
+import asyncio
+import ipaddress
+import json
+import os
+import socket
+import threading
+
+from modules.archive import ArchivePolicy
+from modules.backups import BackupJob
+from modules.dbCon import Database
+from modules.metrics import metrics, timed
+
+# Database methods callable through the service.
+METHODS = {
+    'add_case', 'edit_district', 'edit_case_number', 'edit_party_name', 'edit_status', 'delete_case',
+    'add_cases_bulk', 'update_cases_bulk', 'delete_cases_bulk', 'upsert_cases_bulk', 'apply_case_changes',
+    'get_case', 'search_cases', 'similar_party_names', 'search_all_fields', 'get_cases_page', 'count_cases', 'get_all_cases',
+    'get_facets', 'get_dashboard_stats', 'data_version', 'changes_since', 'purge_tombstones', 'restore',
+    'archive_cases', 'unarchive_cases', 'search_archive', 'count_archived_cases',
+    'journal_position', 'journal_since', 'trim_journal',
+}
+# Async generator methods, whose items are streamed back one line each.
+STREAMING = {'iter_cases'}
+
+
+class CaseServiceError(Exception):
+    """Raised by RemoteDatabase when the service reports a failed call."""
+
+
+def parse_address(address):
+    """Split ``unix:/path/to.sock`` or ``host:port`` into a socket family and address."""
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+def is_loopback(host):
+    """Whether ``host`` only accepts connections from this machine."""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class CaseService:
+    """Serves Database calls to RemoteDatabase clients over a socket."""
+
+    def __init__(self, database, address):
+        self.database = database
+        self.address = address
+
+    async def handle(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    name = request['method']
+                    args, kwargs = request.get('args', []), request.get('kwargs', {})
+                    if name in STREAMING:
+                        async for item in getattr(self.database, name)(*args, **kwargs):
+                            writer.write(json.dumps({'item': item}).encode() + b'\n')
+                            await writer.drain()
+                        response = {'done': True}
+                    elif name in METHODS:
+                        response = {'result': await getattr(self.database, name)(*args, **kwargs)}
+                    else:
+                        raise AttributeError(f"Unknown method {name!r}")
+                except Exception as error:
+                    response = {'error': f"{type(error).__name__}: {error}"}
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self):
+        family, address = parse_address(self.address)
+        # Callers are not authenticated and may restore any file, so stay on this machine
+        if family == socket.AF_INET and not is_loopback(address[0]):
+            raise ValueError(f"Refusing to listen on {address[0]}: the case service has no authentication, use a loopback address or a unix socket")
+        await self.database.connect()
+        if family == socket.AF_UNIX:
+            if os.path.exists(address):
+                os.remove(address)
+            server = await asyncio.start_unix_server(self.handle, path=address, limit=2**24)
+        else:
+            server = await asyncio.start_server(self.handle, *address, limit=2**24)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.database.close()
+
+
+class RemoteDatabase:
+    """Blocking client for a CaseService with the same interface as SyncDatabase.
+
+    Each calling thread gets its own socket, so concurrent Streamlit sessions
+    never share a connection. Rows come back as lists rather than tuples.
+    ``db_file`` names the service's database file, which backups read
+    directly since the service runs on the same machine.
+    """
+
+    def __init__(self, address, db_file='db/data.db'):
+        self.address = address
+        self.db_file = db_file
+        self._local = threading.local()
+
+    def _stream(self):
+        stream = getattr(self._local, 'stream', None)
+        if stream is None:
+            family, address = parse_address(self.address)
+            connection = socket.socket(family, socket.SOCK_STREAM)
+            connection.connect(address)
+            stream = self._local.stream = connection.makefile('rwb')
+        return stream
+
+    def _drop_stream(self):
+        stream = getattr(self._local, 'stream', None)
+        if stream is not None:
+            stream.close()
+            self._local.stream = None
+
+    def _send(self, name, args, kwargs):
+        stream = self._stream()
+        stream.write(json.dumps({'method': name, 'args': args, 'kwargs': kwargs}).encode() + b'\n')
+        stream.flush()
+        return stream
+
+    @staticmethod
+    def _receive(stream):
+        line = stream.readline()
+        if not line:
+            raise CaseServiceError("Case service closed the connection")
+        response = json.loads(line)
+        if 'error' in response:
+            raise CaseServiceError(response['error'])
+        return response
+
+    def call(self, name, *args, **kwargs):
+        """Call a Database method on the service and return its result."""
+        try:
+            # Timed client-side as rpc.<method>; the service records db.<method>
+            with timed(f"rpc.{name}") as sample:
+                result = self._receive(self._send(name, list(args), kwargs))['result']
+                sample['rows'] = len(result) if isinstance(result, list) else None
+                return result
+        except (OSError, CaseServiceError) as error:
+            if isinstance(error, OSError):
+                self._drop_stream()
+            raise
+
+    def iterate(self, name, *args, **kwargs):
+        """Call an async generator method on the service and yield its items."""
+        stream = self._send(name, list(args), kwargs)
+        finished = False
+        try:
+            while True:
+                response = self._receive(stream)
+                if response.get('done'):
+                    finished = True
+                    return
+                yield response['item']
+        finally:
+            # Unread items would be taken as the reply to the next call.
+            if not finished:
+                self._drop_stream()
+
+    def __getattr__(self, name):
+        if name in STREAMING:
+            return lambda *args, **kwargs: self.iterate(name, *args, **kwargs)
+        if name in METHODS:
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+        raise AttributeError(name)
+
+    def start_backup(self, target=None, pages=256, store=None, label='manual'):
+        """Start an online backup of the service's database file; see Database.start_backup."""
+        return BackupJob(self.db_file, target, pages=pages, store=store, label=label).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the case database to Streamlit workers.")
+    parser.add_argument('--db', default='db/data.db')
+    parser.add_argument('--address', default='unix:/tmp/case-service.sock')
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--cache-size', type=int, default=256)
+    parser.add_argument('--archive-after-days', type=int, default=365, help="archive closed and disposed cases untouched this long")
+    parser.add_argument('--metrics-port', type=int, help="serve Prometheus metrics at http://0.0.0.0:PORT/metrics")
+    args = parser.parse_args()
+    if args.metrics_port:
+        metrics.serve(('0.0.0.0', args.metrics_port))
+    database = Database(
+        args.db, cache_size=args.cache_size, readers=args.readers,
+        archive_policy=ArchivePolicy(min_age_days=args.archive_after_days),
+    )
+    asyncio.run(CaseService(database, args.address).serve_forever())
+
+
+if __name__ == '__main__':
+    main()
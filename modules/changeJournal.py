@@ -0,0 +1,215 @@
+import datetime
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+
+# Columns of a case_journal entry, in table order.
+COLUMNS = ('seq', 'at', 'op', 'serial_number', 'old_serial_number', 'district', 'case_number', 'party_name', 'status')
+SEGMENT_NAME = re.compile(r'^(\d{12})-(\d{12})\.jsonl\.gz$')
+RESTORE_NAME = re.compile(r'^restore-(\d{20})\.json$')
+
+
+class RecoveryError(Exception):
+    """Raised when no base snapshot and journal segments cover the requested moment."""
+
+
+class ChangeJournal:
+    """Shipped segments of the database's change journal, for point-in-time recovery.
+
+    ``ship`` moves the entries the database has journaled since the last
+    segment into a new gzipped JSON-lines segment named by its first and
+    last sequence numbers, then trims them from the database. A recovery
+    restores the newest base snapshot taken before the chosen moment and
+    replays the segments' entries up to it. ``mark_restore`` records where
+    a restore replaced the database, so no recovery replays across it.
+    """
+
+    def __init__(self, directory='backups/journal'):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        # Sessions shipping at once would otherwise write overlapping segments
+        self._lock = threading.Lock()
+
+    def segments(self):
+        """List ``(first_seq, last_seq, path)`` for every segment, oldest first."""
+        found = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_NAME.match(name)
+            if match:
+                found.append((int(match.group(1)), int(match.group(2)), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    def last_seq(self):
+        """Sequence number of the newest shipped entry, or 0."""
+        segments = self.segments()
+        return segments[-1][1] if segments else 0
+
+    def restores(self):
+        """List ``(at, seq)`` for every recorded restore, oldest first: its Unix time and journal position."""
+        found = []
+        for name in os.listdir(self.directory):
+            if RESTORE_NAME.match(name):
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    marker = json.load(f)
+                found.append((marker['at'], marker['seq']))
+        return sorted(found)
+
+    def mark_restore(self, db):
+        """Record that ``db`` was just restored, at its current journal position.
+
+        Entries up to that position belong to the replaced timeline: they are
+        only replayed onto bases taken before the restore, for moments before
+        it, and moments after it need a base taken after it.
+        """
+        now = datetime.datetime.now()
+        path = os.path.join(self.directory, f"restore-{now:%Y%m%d%H%M%S%f}.json")
+        with open(path + '.partial', 'w', encoding='utf-8') as f:
+            json.dump({'at': now.timestamp(), 'seq': db.journal_position()}, f)
+        os.replace(path + '.partial', path)
+
+    def ship(self, db, batch_size=50_000):
+        """Write the database's unshipped journal entries to new segments and trim them; returns how many shipped."""
+        with self._lock:
+            return self._ship(db, batch_size)
+
+    def _ship(self, db, batch_size):
+        shipped = 0
+        while True:
+            entries = db.journal_since(self.last_seq(), batch_size)
+            if not entries:
+                return shipped
+            first, last = entries[0][0], entries[-1][0]
+            path = os.path.join(self.directory, f"{first:012d}-{last:012d}.jsonl.gz")
+            partial = path + '.partial'
+            with gzip.open(partial, 'wt', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(dict(zip(COLUMNS, entry)), ensure_ascii=False) + '\n')
+            os.replace(partial, path)
+            db.trim_journal(last)
+            shipped += len(entries)
+            if len(entries) < batch_size:
+                return shipped
+
+    def entries(self, after_seq=0):
+        """Yield shipped entries with a sequence number above ``after_seq``, oldest first.
+
+        Entries repeated by overlapping segments, e.g. from two processes
+        shipping at once, are yielded once.
+        """
+        for first, last, path in self.segments():
+            if last <= after_seq:
+                continue
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry['seq'] > after_seq:
+                        after_seq = entry['seq']
+                        yield entry
+
+    def coverage(self, store):
+        """Return the earliest and latest moments a recovery can target, or ``None`` without a usable base."""
+        bases = _bases(store)
+        if not bases:
+            return None
+        latest = _created(bases[0])
+        segments = self.segments()
+        if segments:
+            with gzip.open(segments[-1][2], 'rt', encoding='utf-8') as f:
+                *_, line = f
+            latest = max(latest, datetime.datetime.fromtimestamp(json.loads(line)['at']))
+        return _created(bases[-1]), latest
+
+    def prune(self, store):
+        """Delete segments older than every base snapshot still in ``store``; returns how many."""
+        bases = _bases(store)
+        if not bases:
+            return 0
+        oldest = min(base['journal_seq'] for base in bases)
+        removed = 0
+        for _, last, path in self.segments():
+            if last <= oldest:
+                os.remove(path)
+                removed += 1
+        # Restores before the oldest base no longer limit any recovery
+        for name in os.listdir(self.directory):
+            match = RESTORE_NAME.match(name)
+            if match and datetime.datetime.strptime(match.group(1), '%Y%m%d%H%M%S%f') < _created(bases[-1]):
+                os.remove(os.path.join(self.directory, name))
+        return removed
+
+    def recover(self, store, when, target):
+        """Rebuild the database as it was at ``when`` into the file ``target``.
+
+        Starts from the newest snapshot in ``store`` created at or before
+        ``when`` and replays shipped entries after it up to ``when``. Returns
+        the base snapshot id and the number of entries replayed. Changes not
+        shipped yet are not included, so ship first.
+
+        Replay never crosses a restore recorded by ``mark_restore``: the base
+        must be taken after the last restore before ``when``, and replay stops
+        at the journal position of the first restore after the base.
+        """
+        cutoff = when.timestamp()
+        restores = self.restores()
+        since = max((at for at, _ in restores if at <= cutoff), default=None)
+        candidates = [
+            base for base in _bases(store)
+            if _created(base) <= when and (since is None or _created(base).timestamp() >= since)
+        ]
+        if not candidates:
+            if since is not None:
+                raise RecoveryError(
+                    f"No snapshot was taken between the restore at {datetime.datetime.fromtimestamp(since):%Y-%m-%d %H:%M:%S} "
+                    f"and {when:%Y-%m-%d %H:%M:%S}")
+            raise RecoveryError(f"No snapshot with a journal position was taken before {when:%Y-%m-%d %H:%M:%S}")
+        base = candidates[0]
+        # Later entries belong to the timeline a restore started
+        stop = min((seq for at, seq in restores if at > _created(base).timestamp()), default=None)
+        store.restore(base['id'], target)
+        replayed = 0
+        connection = sqlite3.connect(target)
+        try:
+            # Replay must not recycle sequence numbers of entries shipped after the base
+            connection.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'case_journal'", (self.last_seq(),))
+            for entry in self.entries(base['journal_seq']):
+                if entry['at'] > cutoff or (stop is not None and entry['seq'] > stop):
+                    break
+                _replay(connection, entry)
+                replayed += 1
+            # The replayed changes are already in the shipped segments
+            connection.execute("DELETE FROM case_journal")
+            connection.commit()
+        finally:
+            connection.close()
+        return base['id'], replayed
+
+
+def _replay(connection, entry):
+    values = (entry['district'], entry['case_number'], entry['party_name'], entry['status'])
+    if entry['op'] == 'I':
+        # Deleting first keeps the triggers' indexes right if the row somehow exists
+        connection.execute("DELETE FROM cases WHERE serial_number = ?", (entry['serial_number'],))
+        connection.execute("""
+            INSERT INTO cases (serial_number, district, case_number, party_name, status)
+            VALUES (?, ?, ?, ?, ?);
+        """, (entry['serial_number'], *values))
+    elif entry['op'] == 'U':
+        connection.execute("""
+            UPDATE cases
+            SET serial_number = ?, district = ?, case_number = ?, party_name = ?, status = ?
+            WHERE serial_number = ?;
+        """, (entry['serial_number'], *values, entry['old_serial_number'] or entry['serial_number']))
+    elif entry['op'] == 'D':
+        connection.execute("DELETE FROM cases WHERE serial_number = ?", (entry['serial_number'],))
+
+
+def _bases(store):
+    """Snapshots that record their journal position, newest first."""
+    return [snapshot for snapshot in store.snapshots() if snapshot.get('journal_seq') is not None]
+
+
+def _created(snapshot):
+    return datetime.datetime.fromisoformat(snapshot['created'])
@@ -1,14 +1,265 @@
+import asyncio
+import contextlib
+import contextvars
+import datetime
+import functools
+import inspect
+import os
+import sqlite3
+import threading
+import urllib.parse
+
 import aiosqlite
 
+from modules.archive import ARCHIVE_SCHEMA, ArchivePolicy, archive_path
+from modules.backups import BackupJob
+from modules.metrics import instrument_methods
+from modules.queryCache import QueryCache, cached
+
+# Queries shorter than a trigram cannot use the trigram index, so they fall
+# back to a LIKE scan, which paged queries stop early once a page is full.
+TRIGRAM_MIN_LENGTH = 3
+
+# Party names are indexed by the trigrams of ' name ', up to this many characters.
+PARTY_NAME_MAX_INDEXED = 256
+# Names sharing the most trigrams with a fuzzy query that are re-ranked by edit distance.
+FUZZY_CANDIDATES = 200
+
+# More changed cases than this since a session's copy and it reloads instead of patching.
+CHANGES_LIMIT = 1000
+# Deletion tombstones in case_versions are kept this long for sessions to catch up.
+TOMBSTONE_MAX_AGE_DAYS = 7
+
+# Applied to every connection: WAL lets readers run alongside the writer,
+# synchronous=NORMAL is durable in WAL mode without an fsync per commit, and
+# busy_timeout makes competing writers wait instead of failing with "locked".
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # KiB, i.e. 64 MiB
+    'temp_store': 'MEMORY',
+}
+
+# The Database whose transaction the current task is running inside, if any.
+_active_transaction = contextvars.ContextVar('active_transaction', default=None)
+# A connection the current task's reads must use instead of the pool, if any.
+_read_connection = contextvars.ContextVar('read_connection', default=None)
+
+# Every public coroutine and async generator method records its latency and
+# row count under ``db.<method>``; cache hits are timed too.
+@instrument_methods('db')
 class Database:
-    def __init__(self, db_file='db/data.db'):
+    # Schema migrations in order; PRAGMA user_version records how many have run.
+    MIGRATIONS = (
+        'create_table',
+        'create_search_index',
+        'create_lookup_indexes',
+        'create_change_tracking',
+        'create_party_name_index',
+        'add_change_times',
+        'create_change_journal',
+        'create_case_facets',
+        'drop_prefix_index',
+        'create_case_key_index',
+    )
+
+    def __init__(self, db_file='db/data.db', cache_size=256, cache_ttl=30, readers=0, archive_file=None, archive_policy=None):
         self.db_file = db_file
+        self.readers = readers
+        self.archive_file = archive_file or archive_path(db_file)
+        # With a policy, closed cases are archived on its schedule while connected
+        self.archive_policy = archive_policy
+        self.archive_status = {'last_run': None, 'moved': 0, 'error': None}
+        self._archiver = None
+        self._archive_lock = None
+        self.cache = QueryCache(cache_size, cache_ttl)
         self.connection = None
+        self.loop = None
+        self._thread = None
+        self._write_lock = None
+        self._reader_pool = None
 
     async def connect(self):
         """Connect to the SQLite database."""
         self.connection = await aiosqlite.connect(self.db_file)
-        await self.create_table()
+        self._write_lock = asyncio.Lock()
+        self._archive_lock = asyncio.Lock()
+        for pragma, value in PRAGMAS.items():
+            await self.connection.execute(f"PRAGMA {pragma} = {value}")
+        await self.migrate()
+        if self.readers:
+            # Extra read-only connections so reads run in parallel with each
+            # other and with the writer; WAL gives each a consistent snapshot.
+            self._reader_pool = asyncio.Queue()
+            for _ in range(self.readers):
+                self._reader_pool.put_nowait(await self.open_reader())
+        if self.archive_policy is not None:
+            self._archiver = asyncio.create_task(self._archive_periodically())
+
+    async def open_reader(self):
+        """Open a read-only connection with the usual pragmas; the caller closes it."""
+        reader = await aiosqlite.connect(self.db_file)
+        for pragma, value in PRAGMAS.items():
+            await reader.execute(f"PRAGMA {pragma} = {value}")
+        await reader.execute("PRAGMA query_only = ON")
+        return reader
+
+    @contextlib.contextmanager
+    def reading_on(self, connection):
+        """Run the current task's reads on ``connection`` instead of the pool, e.g. one that can be interrupted."""
+        token = _read_connection.set(connection)
+        try:
+            yield connection
+        finally:
+            _read_connection.reset(token)
+
+    async def migrate(self):
+        """Run the schema migrations this database has not seen yet.
+
+        Each migration and its ``user_version`` bump run in one savepoint, so
+        a migration that fails or is cut short leaves no trace and runs again
+        on the next start. Inside ``restore``'s transaction they commit with it.
+        """
+        cursor = await self.connection.execute("PRAGMA user_version")
+        version = (await cursor.fetchone())[0]
+        for number, name in enumerate(self.MIGRATIONS, start=1):
+            if number > version:
+                await self.connection.execute("SAVEPOINT migration")
+                try:
+                    await getattr(self, name)()
+                    await self.connection.execute(f"PRAGMA user_version = {number}")
+                except BaseException:
+                    await self.connection.execute("ROLLBACK TO migration")
+                    await self.connection.execute("RELEASE migration")
+                    raise
+                await self.connection.execute("RELEASE migration")
+                if _active_transaction.get() is not self:
+                    await self.connection.commit()
+
+    async def _execute_script(self, script):
+        """Run the statements of ``script`` one by one in the current transaction.
+
+        Unlike ``executescript``, which commits first and then runs each
+        statement on its own, this keeps a migration atomic.
+        """
+        statement = ''
+        for line in script.splitlines(keepends=True):
+            statement += line
+            if sqlite3.complete_statement(statement):
+                await self.connection.execute(statement)
+                statement = ''
+
+    def start(self):
+        """Connect on a long-lived background event loop and return a blocking facade."""
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self.loop.run_forever, name='database-loop', daemon=True)
+            self._thread.start()
+            self.run(self.connect())
+        return SyncDatabase(self)
+
+    def run(self, coro):
+        """Run a coroutine on the background loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def stop(self):
+        """Close the connection and shut down the background loop."""
+        if self.loop is None:
+            return
+        self.run(self.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self.loop = None
+        self._thread = None
+
+    def start_backup(self, target=None, pages=256, store=None, label='manual'):
+        """Start an online backup to ``target`` or into ``store`` on a background thread and return the job."""
+        return BackupJob(self.db_file, target, pages=pages, store=store, label=label).start()
+
+    async def restore(self, path):
+        """Replace the database contents with the snapshot file at ``path``.
+
+        The copy goes through the backup API into the live file, so open
+        connections see the restored data instead of a file swapped under them.
+        """
+        async with self.transaction() as connection:
+            previous = await self.data_version()
+            journal_position = await self.journal_position()
+            await asyncio.to_thread(_copy_database, path, self.db_file)
+            # Reading the schema table makes SQLite notice the copied schema;
+            # statements prepared against the cached one would fail otherwise.
+            await connection.execute("SELECT count(*) FROM sqlite_master")
+            # The snapshot may predate newer migrations and carries its own,
+            # older data version: move past both and make every session reload.
+            await self.migrate()
+            await connection.execute("""
+                UPDATE data_version
+                SET version = MAX(version, ?) + 1, reset_version = MAX(version, ?) + 1;
+            """, (previous, previous))
+            # Journal sequence numbers must never repeat, or shipped segments would overlap
+            await connection.execute("""
+                UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'case_journal';
+            """, (journal_position,))
+            await connection.execute("""
+                INSERT INTO sqlite_sequence (name, seq)
+                SELECT 'case_journal', ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'case_journal');
+            """, (journal_position,))
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        """Group any mix of writes into one commit, rolling all of them back on error.
+
+        Writes made inside the block join it instead of committing on their
+        own; nested ``transaction()`` blocks join the outermost one.
+        """
+        if _active_transaction.get() is self:
+            yield self.connection
+            return
+        async with self._write_lock:
+            token = _active_transaction.set(self)
+            try:
+                yield self.connection
+                await self.connection.commit()
+                self.cache.invalidate()
+            except BaseException:
+                await self.connection.rollback()
+                # Reads made meanwhile may have cached the rolled-back rows
+                self.cache.invalidate()
+                raise
+            finally:
+                _active_transaction.reset(token)
+
+    @contextlib.asynccontextmanager
+    async def _read(self):
+        """Borrow a connection for a read.
+
+        Uses a pooled reader when there is one, except inside a transaction,
+        which must read its own uncommitted writes on the main connection.
+        Without a pool, reads wait for other tasks' transactions to finish,
+        so they never see writes that are not committed yet.
+        """
+        if _read_connection.get() is not None and _active_transaction.get() is not self:
+            yield _read_connection.get()
+            return
+        if _active_transaction.get() is self:
+            yield self.connection
+            return
+        if self._reader_pool is None:
+            async with self._write_lock:
+                yield self.connection
+            return
+        connection = await self._reader_pool.get()
+        try:
+            yield connection
+        finally:
+            self._reader_pool.put_nowait(connection)
+
+    def _write(self):
+        """Serialize a single write against other sessions and commit it."""
+        return self.transaction()
 
     async def create_table(self):
         """Create the cases table if it doesn't exist."""
@@ -21,93 +272,944 @@ class Database:
                 status TEXT
             );
         """)
-        await self.connection.commit()
+
+    async def create_search_index(self):
+        """Create the FTS5 indexes mirroring the cases table and their sync triggers."""
+        cursor = await self.connection.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name IN ('cases_fts', 'cases_prefix');
+        """)
+        existing = {row[0] for row in await cursor.fetchall()}
+        await self._execute_script("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS cases_fts USING fts5(
+                district, case_number, party_name, status,
+                content='cases', content_rowid='serial_number',
+                tokenize='trigram'
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS cases_prefix USING fts5(
+                district, case_number, party_name, status,
+                content='cases', content_rowid='serial_number',
+                tokenize='unicode61', prefix='1 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS cases_fts_insert AFTER INSERT ON cases BEGIN
+                INSERT INTO cases_fts(rowid, district, case_number, party_name, status)
+                VALUES (new.serial_number, new.district, new.case_number, new.party_name, new.status);
+                INSERT INTO cases_prefix(rowid, district, case_number, party_name, status)
+                VALUES (new.serial_number, new.district, new.case_number, new.party_name, new.status);
+            END;
+            CREATE TRIGGER IF NOT EXISTS cases_fts_delete AFTER DELETE ON cases BEGIN
+                INSERT INTO cases_fts(cases_fts, rowid, district, case_number, party_name, status)
+                VALUES ('delete', old.serial_number, old.district, old.case_number, old.party_name, old.status);
+                INSERT INTO cases_prefix(cases_prefix, rowid, district, case_number, party_name, status)
+                VALUES ('delete', old.serial_number, old.district, old.case_number, old.party_name, old.status);
+            END;
+            CREATE TRIGGER IF NOT EXISTS cases_fts_update AFTER UPDATE ON cases BEGIN
+                INSERT INTO cases_fts(cases_fts, rowid, district, case_number, party_name, status)
+                VALUES ('delete', old.serial_number, old.district, old.case_number, old.party_name, old.status);
+                INSERT INTO cases_prefix(cases_prefix, rowid, district, case_number, party_name, status)
+                VALUES ('delete', old.serial_number, old.district, old.case_number, old.party_name, old.status);
+                INSERT INTO cases_fts(rowid, district, case_number, party_name, status)
+                VALUES (new.serial_number, new.district, new.case_number, new.party_name, new.status);
+                INSERT INTO cases_prefix(rowid, district, case_number, party_name, status)
+                VALUES (new.serial_number, new.district, new.case_number, new.party_name, new.status);
+            END;
+        """)
+        # Index rows that were written before the FTS tables existed.
+        if 'cases_fts' not in existing:
+            await self.connection.execute("INSERT INTO cases_fts(cases_fts) VALUES ('rebuild');")
+        if 'cases_prefix' not in existing:
+            await self.connection.execute("INSERT INTO cases_prefix(cases_prefix) VALUES ('rebuild');")
+
+    async def create_lookup_indexes(self):
+        """Index the columns the case lists filter and look up by."""
+        await self._execute_script("""
+            CREATE INDEX IF NOT EXISTS idx_cases_district ON cases (district);
+            CREATE INDEX IF NOT EXISTS idx_cases_status ON cases (status);
+            CREATE INDEX IF NOT EXISTS idx_cases_case_number ON cases (case_number);
+        """)
+
+    async def create_change_tracking(self):
+        """Stamp every changed case with a new data version, keeping tombstones for deletions.
+
+        ``data_version`` holds the counter, bumped once per changed row, and
+        ``reset_version``: sessions that last synced before it must reload.
+        """
+        await self._execute_script("""
+            CREATE TABLE IF NOT EXISTS data_version (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                version INTEGER NOT NULL,
+                reset_version INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO data_version (id, version, reset_version) VALUES (0, 1, 1);
+            CREATE TABLE IF NOT EXISTS case_versions (
+                serial_number INTEGER PRIMARY KEY,
+                version INTEGER NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_case_versions_version ON case_versions (version);
+            CREATE TRIGGER IF NOT EXISTS cases_version_insert AFTER INSERT ON cases BEGIN
+                UPDATE data_version SET version = version + 1;
+                INSERT OR REPLACE INTO case_versions (serial_number, version, deleted)
+                SELECT new.serial_number, version, 0 FROM data_version;
+            END;
+            CREATE TRIGGER IF NOT EXISTS cases_version_update AFTER UPDATE ON cases BEGIN
+                UPDATE data_version SET version = version + 1;
+                INSERT OR REPLACE INTO case_versions (serial_number, version, deleted)
+                SELECT old.serial_number, version, 1 FROM data_version
+                WHERE old.serial_number != new.serial_number;
+                INSERT OR REPLACE INTO case_versions (serial_number, version, deleted)
+                SELECT new.serial_number, version, 0 FROM data_version;
+            END;
+            CREATE TRIGGER IF NOT EXISTS cases_version_delete AFTER DELETE ON cases BEGIN
+                UPDATE data_version SET version = version + 1;
+                INSERT OR REPLACE INTO case_versions (serial_number, version, deleted)
+                SELECT old.serial_number, version, 1 FROM data_version;
+            END;
+        """)
+
+    async def create_party_name_index(self):
+        """Create the trigram index over distinct party names behind ``search_cases``.
+
+        ``party_names`` holds each lower-cased name once with the number of
+        cases using it, and ``party_trigrams`` its padded trigrams; triggers
+        keep both in step with the cases table.
+        """
+        await self.connection.execute("CREATE TABLE IF NOT EXISTS ngram_offsets (n INTEGER PRIMARY KEY)")
+        await self.connection.executemany(
+            "INSERT OR IGNORE INTO ngram_offsets (n) VALUES (?)",
+            [(n,) for n in range(1, PARTY_NAME_MAX_INDEXED + 1)],
+        )
+        await self._execute_script("""
+            CREATE TABLE IF NOT EXISTS party_names (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                cases INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS party_trigrams (
+                trigram TEXT NOT NULL,
+                name_id INTEGER NOT NULL,
+                PRIMARY KEY (trigram, name_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_cases_party_name ON cases (lower(party_name));
+            CREATE TRIGGER IF NOT EXISTS party_names_insert AFTER INSERT ON party_names BEGIN
+                INSERT OR IGNORE INTO party_trigrams (trigram, name_id)
+                SELECT substr(' ' || new.name || ' ', n, 3), new.id FROM ngram_offsets
+                WHERE n <= length(new.name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS party_names_delete AFTER DELETE ON party_names BEGIN
+                DELETE FROM party_trigrams
+                WHERE name_id = old.id AND trigram IN (
+                    SELECT substr(' ' || old.name || ' ', n, 3) FROM ngram_offsets
+                    WHERE n <= length(old.name)
+                );
+            END;
+            CREATE TRIGGER IF NOT EXISTS cases_party_insert AFTER INSERT ON cases BEGIN
+                INSERT INTO party_names (name, cases) VALUES (lower(new.party_name), 1)
+                ON CONFLICT (name) DO UPDATE SET cases = cases + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS cases_party_delete AFTER DELETE ON cases BEGIN
+                UPDATE party_names SET cases = cases - 1 WHERE name = lower(old.party_name);
+                DELETE FROM party_names WHERE name = lower(old.party_name) AND cases <= 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS cases_party_update AFTER UPDATE OF party_name ON cases
+            WHEN lower(old.party_name) IS NOT lower(new.party_name) BEGIN
+                INSERT INTO party_names (name, cases) VALUES (lower(new.party_name), 1)
+                ON CONFLICT (name) DO UPDATE SET cases = cases + 1;
+                UPDATE party_names SET cases = cases - 1 WHERE name = lower(old.party_name);
+                DELETE FROM party_names WHERE name = lower(old.party_name) AND cases <= 0;
+            END;
+            INSERT OR IGNORE INTO party_names (name, cases)
+            SELECT lower(party_name), COUNT(*) FROM cases GROUP BY lower(party_name);
+        """)
+
+    async def add_change_times(self):
+        """Record when each case last changed, which the archive policy ages cases by.
+
+        Cases from before this migration count as changed when it runs.
+        """
+        cursor = await self.connection.execute("SELECT 1 FROM pragma_table_info('case_versions') WHERE name = 'changed_at'")
+        if await cursor.fetchone() is None:
+            await self.connection.execute("ALTER TABLE case_versions ADD COLUMN changed_at TEXT")
+        await self._execute_script("""
+            UPDATE case_versions SET changed_at = datetime('now') WHERE changed_at IS NULL;
+            INSERT OR IGNORE INTO case_versions (serial_number, version, deleted, changed_at)
+            SELECT serial_number, 0, 0, datetime('now') FROM cases;
+            DROP TRIGGER IF EXISTS cases_version_insert;
+            DROP TRIGGER IF EXISTS cases_version_update;
+            DROP TRIGGER IF EXISTS cases_version_delete;
+            CREATE TRIGGER cases_version_insert AFTER INSERT ON cases BEGIN
+                UPDATE data_version SET version = version + 1;
+                INSERT OR REPLACE INTO case_versions (serial_number, version, deleted, changed_at)
+                SELECT new.serial_number, version, 0, datetime('now') FROM data_version;
+            END;
+            CREATE TRIGGER cases_version_update AFTER UPDATE ON cases BEGIN
+                UPDATE data_version SET version = version + 1;
+                INSERT OR REPLACE INTO case_versions (serial_number, version, deleted, changed_at)
+                SELECT old.serial_number, version, 1, datetime('now') FROM data_version
+                WHERE old.serial_number != new.serial_number;
+                INSERT OR REPLACE INTO case_versions (serial_number, version, deleted, changed_at)
+                SELECT new.serial_number, version, 0, datetime('now') FROM data_version;
+            END;
+            CREATE TRIGGER cases_version_delete AFTER DELETE ON cases BEGIN
+                UPDATE data_version SET version = version + 1;
+                INSERT OR REPLACE INTO case_versions (serial_number, version, deleted, changed_at)
+                SELECT old.serial_number, version, 1, datetime('now') FROM data_version;
+            END;
+        """)
+
+    async def create_change_journal(self):
+        """Append every insert, update and delete of a case to ``case_journal``.
+
+        Entries carry the new column values (none for deletes), the serial
+        number before an update if it changed, and ``at`` in Unix seconds.
+        The journal is shipped out as segments by :mod:`modules.changeJournal`
+        and trimmed, so it only holds what has not been shipped yet.
+        """
+        await self._execute_script("""
+            CREATE TABLE IF NOT EXISTS case_journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                at REAL NOT NULL,
+                op TEXT NOT NULL,
+                serial_number INTEGER NOT NULL,
+                old_serial_number INTEGER,
+                district TEXT,
+                case_number TEXT,
+                party_name TEXT,
+                status TEXT
+            );
+            CREATE TRIGGER IF NOT EXISTS cases_journal_insert AFTER INSERT ON cases BEGIN
+                INSERT INTO case_journal (at, op, serial_number, district, case_number, party_name, status)
+                VALUES ((julianday('now') - 2440587.5) * 86400.0, 'I',
+                        new.serial_number, new.district, new.case_number, new.party_name, new.status);
+            END;
+            CREATE TRIGGER IF NOT EXISTS cases_journal_update AFTER UPDATE ON cases BEGIN
+                INSERT INTO case_journal (at, op, serial_number, old_serial_number, district, case_number, party_name, status)
+                VALUES ((julianday('now') - 2440587.5) * 86400.0, 'U', new.serial_number,
+                        NULLIF(old.serial_number, new.serial_number),
+                        new.district, new.case_number, new.party_name, new.status);
+            END;
+            CREATE TRIGGER IF NOT EXISTS cases_journal_delete AFTER DELETE ON cases BEGIN
+                INSERT INTO case_journal (at, op, serial_number)
+                VALUES ((julianday('now') - 2440587.5) * 86400.0, 'D', old.serial_number);
+            END;
+        """)
+
+    async def create_case_facets(self):
+        """Keep the number of cases per district and status in ``case_facets``.
+
+        The table has one row per combination in use, so facet counts and
+        unsearched case counts read a few hundred rows instead of the cases
+        table. The (district, status) index serves lists filtered by both and,
+        as its prefix, by district alone, replacing the district index.
+        """
+        await self._execute_script("""
+            CREATE TABLE IF NOT EXISTS case_facets (
+                district TEXT NOT NULL,
+                status TEXT,
+                cases INTEGER NOT NULL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_case_facets ON case_facets (district, status);
+            CREATE INDEX IF NOT EXISTS idx_cases_district_status ON cases (district, status);
+            DROP INDEX IF EXISTS idx_cases_district;
+            CREATE TRIGGER IF NOT EXISTS cases_facets_insert AFTER INSERT ON cases BEGIN
+                INSERT INTO case_facets (district, status, cases)
+                SELECT new.district, new.status, 0
+                WHERE NOT EXISTS (SELECT 1 FROM case_facets WHERE district = new.district AND status IS new.status);
+                UPDATE case_facets SET cases = cases + 1 WHERE district = new.district AND status IS new.status;
+            END;
+            CREATE TRIGGER IF NOT EXISTS cases_facets_delete AFTER DELETE ON cases BEGIN
+                UPDATE case_facets SET cases = cases - 1 WHERE district = old.district AND status IS old.status;
+                DELETE FROM case_facets WHERE district = old.district AND status IS old.status AND cases <= 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS cases_facets_update AFTER UPDATE OF district, status ON cases
+            WHEN old.district IS NOT new.district OR old.status IS NOT new.status BEGIN
+                INSERT INTO case_facets (district, status, cases)
+                SELECT new.district, new.status, 0
+                WHERE NOT EXISTS (SELECT 1 FROM case_facets WHERE district = new.district AND status IS new.status);
+                UPDATE case_facets SET cases = cases + 1 WHERE district = new.district AND status IS new.status;
+                UPDATE case_facets SET cases = cases - 1 WHERE district = old.district AND status IS old.status;
+                DELETE FROM case_facets WHERE district = old.district AND status IS old.status AND cases <= 0;
+            END;
+            INSERT INTO case_facets (district, status, cases)
+            SELECT district, status, COUNT(*) FROM cases
+            WHERE NOT EXISTS (SELECT 1 FROM case_facets)
+            GROUP BY district, status;
+        """)
+
+    async def drop_prefix_index(self):
+        """Drop the unicode61 prefix index; short queries now use the same substring rule as the archive."""
+        await self._execute_script("""
+            DROP TRIGGER IF EXISTS cases_fts_insert;
+            DROP TRIGGER IF EXISTS cases_fts_delete;
+            DROP TRIGGER IF EXISTS cases_fts_update;
+            DROP TABLE IF EXISTS cases_prefix;
+            CREATE TRIGGER cases_fts_insert AFTER INSERT ON cases BEGIN
+                INSERT INTO cases_fts(rowid, district, case_number, party_name, status)
+                VALUES (new.serial_number, new.district, new.case_number, new.party_name, new.status);
+            END;
+            CREATE TRIGGER cases_fts_delete AFTER DELETE ON cases BEGIN
+                INSERT INTO cases_fts(cases_fts, rowid, district, case_number, party_name, status)
+                VALUES ('delete', old.serial_number, old.district, old.case_number, old.party_name, old.status);
+            END;
+            CREATE TRIGGER cases_fts_update AFTER UPDATE ON cases BEGIN
+                INSERT INTO cases_fts(cases_fts, rowid, district, case_number, party_name, status)
+                VALUES ('delete', old.serial_number, old.district, old.case_number, old.party_name, old.status);
+                INSERT INTO cases_fts(rowid, district, case_number, party_name, status)
+                VALUES (new.serial_number, new.district, new.case_number, new.party_name, new.status);
+            END;
+        """)
+
+    async def create_case_key_index(self):
+        """Index case numbers case-insensitively, for matching imported rows to cases typed in any case."""
+        await self.connection.execute("CREATE INDEX IF NOT EXISTS idx_cases_case_number_upper ON cases (upper(case_number))")
+
+    async def journal_position(self):
+        """Return the sequence number of the newest journal entry ever written, shipped or not."""
+        async with self._read() as connection:
+            cursor = await connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'case_journal'")
+            row = await cursor.fetchone()
+            return row[0] if row else 0
+
+    async def journal_since(self, after_seq, limit=50_000):
+        """Return up to ``limit`` journal entries after ``after_seq``, oldest first."""
+        async with self._read() as connection:
+            cursor = await connection.execute("""
+                SELECT * FROM case_journal
+                WHERE seq > ?
+                ORDER BY seq
+                LIMIT ?;
+            """, (after_seq, limit))
+            return await cursor.fetchall()
+
+    async def trim_journal(self, upto_seq):
+        """Drop journal entries up to ``upto_seq`` once they are shipped."""
+        async with self._write() as connection:
+            await connection.execute("DELETE FROM case_journal WHERE seq <= ?", (upto_seq,))
+
+    @contextlib.asynccontextmanager
+    async def _archive_attached(self):
+        """Attach the archive file to the writer connection, creating its schema, for the duration of the block.
+
+        ATTACH and DETACH cannot run inside a transaction, so both take the
+        write lock; the moves in between are ordinary ``transaction()`` blocks.
+        """
+        async with self._archive_lock:
+            async with self._write_lock:
+                await self.connection.execute("ATTACH DATABASE ? AS archive", (self.archive_file,))
+                await self.connection.executescript(ARCHIVE_SCHEMA)
+            try:
+                yield
+            finally:
+                async with self._write_lock:
+                    await self.connection.execute("DETACH DATABASE archive")
+
+    async def archive_cases(self, policy=None):
+        """Move the cases ``policy`` selects into the archive file, one batch per transaction.
+
+        Returns how many cases moved. SQLite commits each attached file on its
+        own in WAL mode, so each batch is removed from the archive first and a
+        crash can at worst leave a batch in both files, which the next run fixes.
+        """
+        policy = policy or self.archive_policy or ArchivePolicy()
+        statuses = policy.status_values()
+        cutoff = policy.cutoff()
+        moved = 0
+        async with self._archive_attached():
+            while True:
+                async with self.transaction() as connection:
+                    cursor = await connection.execute(f"""
+                        SELECT serial_number FROM main.cases
+                        JOIN main.case_versions USING (serial_number)
+                        WHERE cases.status IN ({', '.join('?' * len(statuses))}) AND case_versions.changed_at < ?
+                        LIMIT ?;
+                    """, (*statuses, cutoff, policy.batch_size))
+                    batch = [row[0] for row in await cursor.fetchall()]
+                    if batch:
+                        await self._move_cases(connection, 'main', 'archive', batch)
+                moved += len(batch)
+                if len(batch) < policy.batch_size:
+                    return moved
+
+    async def unarchive_cases(self, serial_numbers):
+        """Move archived cases back into the live table, e.g. when a matter is reopened.
+
+        Returns how many cases moved. Raises ``ValueError`` without moving
+        anything if some of the serial numbers are not in the archive.
+        """
+        serial_numbers = list(dict.fromkeys(serial_numbers))
+        moved = 0
+        async with self._archive_attached():
+            async with self.transaction() as connection:
+                archived = set()
+                for start in range(0, len(serial_numbers), 500):
+                    chunk = serial_numbers[start:start + 500]
+                    cursor = await connection.execute(
+                        f"SELECT serial_number FROM archive.cases WHERE serial_number IN ({', '.join('?' * len(chunk))})", chunk)
+                    archived.update(row[0] for row in await cursor.fetchall())
+                missing = [serial for serial in serial_numbers if serial not in archived]
+                if missing:
+                    raise ValueError(f"Not in the archive: {', '.join(map(str, missing))}")
+                for start in range(0, len(serial_numbers), 500):
+                    moved += await self._move_cases(connection, 'archive', 'main', serial_numbers[start:start + 500])
+        return moved
+
+    @staticmethod
+    async def _move_cases(connection, source, target, serial_numbers):
+        """Move the listed cases that exist in ``source`` to ``target``; returns how many moved."""
+        # Only rows present in the source may replace rows in the target
+        moving = f"SELECT serial_number FROM {source}.cases WHERE serial_number IN ({', '.join('?' * len(serial_numbers))})"
+        await connection.execute(f"DELETE FROM {target}.cases WHERE serial_number IN ({moving})", serial_numbers)
+        cursor = await connection.execute(f"""
+            INSERT INTO {target}.cases (serial_number, district, case_number, party_name, status)
+            SELECT serial_number, district, case_number, party_name, status FROM {source}.cases
+            WHERE serial_number IN ({moving});
+        """, serial_numbers)
+        await connection.execute(f"DELETE FROM {source}.cases WHERE serial_number IN ({moving})", serial_numbers)
+        return cursor.rowcount
+
+    async def _archive_periodically(self):
+        """Run ``archive_cases`` and ``purge_tombstones`` now and then every ``archive_policy.interval`` seconds."""
+        while True:
+            try:
+                self.archive_status['moved'] = await self.archive_cases()
+                await self.purge_tombstones()
+                self.archive_status['error'] = None
+            except Exception as error:
+                self.archive_status['error'] = str(error)
+            self.archive_status['last_run'] = datetime.datetime.now()
+            await asyncio.sleep(self.archive_policy.interval)
+
+    @contextlib.asynccontextmanager
+    async def _archive_reader(self):
+        """Open the archive file read-only, or yield None if nothing was archived yet.
+
+        Archive searches get their own short-lived connection, so the hot
+        connections never have the archive attached while serving reads.
+        """
+        if not os.path.exists(self.archive_file):
+            yield None
+            return
+        uri = f"file:{urllib.parse.quote(os.path.abspath(self.archive_file))}?mode=ro"
+        async with aiosqlite.connect(uri, uri=True) as connection:
+            yield connection
+
+    @cached
+    async def search_archive(self, query, limit=None):
+        """Search the archived cases across all fields, newest first; an empty query lists them all."""
+        query = query.strip()
+        async with self._archive_reader() as connection:
+            if connection is None:
+                return []
+            if not query:
+                cursor = await connection.execute(
+                    "SELECT * FROM cases ORDER BY serial_number DESC LIMIT ?", (-1 if limit is None else limit,))
+            else:
+                condition, params = self._search_condition(query)
+                cursor = await connection.execute(f"""
+                    SELECT * FROM cases
+                    WHERE {condition}
+                    ORDER BY serial_number DESC
+                    LIMIT ?;
+                """, (*params, -1 if limit is None else limit))
+            return await cursor.fetchall()
+
+    @cached
+    async def count_archived_cases(self):
+        """Count the cases in the archive file."""
+        async with self._archive_reader() as connection:
+            if connection is None:
+                return 0
+            cursor = await connection.execute("SELECT COUNT(*) FROM cases")
+            return (await cursor.fetchone())[0]
 
     async def add_case(self, district, case_number, party_name, status=None):
         """Add a new case to the database."""
-        await self.connection.execute("""
-            INSERT INTO cases (district, case_number, party_name, status)
-            VALUES (?, ?, ?, ?);
-        """, (district, case_number, party_name, status))
-        await self.connection.commit()
+        async with self._write() as connection:
+            await connection.execute("""
+                INSERT INTO cases (district, case_number, party_name, status)
+                VALUES (?, ?, ?, ?);
+            """, (district, case_number, party_name, status))
 
     async def edit_district(self, serial_number, new_district):
         """Edit the district of a case."""
-        await self.connection.execute("""
-            UPDATE cases
-            SET district = ?
-            WHERE serial_number = ?;
-        """, (new_district, serial_number))
-        await self.connection.commit()
+        async with self._write() as connection:
+            await connection.execute("""
+                UPDATE cases
+                SET district = ?
+                WHERE serial_number = ?;
+            """, (new_district, serial_number))
 
     async def edit_case_number(self, serial_number, new_case_number):
         """Edit the case number of a case."""
-        await self.connection.execute("""
-            UPDATE cases
-            SET case_number = ?
-            WHERE serial_number = ?;
-        """, (new_case_number, serial_number))
-        await self.connection.commit()
+        async with self._write() as connection:
+            await connection.execute("""
+                UPDATE cases
+                SET case_number = ?
+                WHERE serial_number = ?;
+            """, (new_case_number, serial_number))
 
     async def edit_party_name(self, serial_number, new_party_name):
         """Edit the party name of a case."""
-        await self.connection.execute("""
-            UPDATE cases
-            SET party_name = ?
-            WHERE serial_number = ?;
-        """, (new_party_name, serial_number))
-        await self.connection.commit()
+        async with self._write() as connection:
+            await connection.execute("""
+                UPDATE cases
+                SET party_name = ?
+                WHERE serial_number = ?;
+            """, (new_party_name, serial_number))
 
     async def edit_status(self, serial_number, new_status):
         """Edit the status of a case."""
-        await self.connection.execute("""
-            UPDATE cases
-            SET status = ?
-            WHERE serial_number = ?;
-        """, (new_status, serial_number))
-        await self.connection.commit()
+        async with self._write() as connection:
+            await connection.execute("""
+                UPDATE cases
+                SET status = ?
+                WHERE serial_number = ?;
+            """, (new_status, serial_number))
 
     async def delete_case(self, serial_number):
         """Delete a case from the database."""
-        await self.connection.execute("""
-            DELETE FROM cases
-            WHERE serial_number = ?;
-        """, (serial_number,))
-        await self.connection.commit()
+        async with self._write() as connection:
+            await connection.execute("""
+                DELETE FROM cases
+                WHERE serial_number = ?;
+            """, (serial_number,))
+
+    async def add_cases_bulk(self, cases):
+        """Add many cases in one commit from ``(district, case_number, party_name, status)`` tuples."""
+        async with self._write() as connection:
+            await connection.executemany("""
+                INSERT INTO cases (district, case_number, party_name, status)
+                VALUES (?, ?, ?, ?);
+            """, cases)
+
+    async def update_cases_bulk(self, cases):
+        """Update many cases in one commit from ``(district, case_number, party_name, status, serial_number)`` tuples."""
+        async with self._write() as connection:
+            await connection.executemany("""
+                UPDATE cases
+                SET district = ?, case_number = ?, party_name = ?, status = ?
+                WHERE serial_number = ?;
+            """, cases)
+
+    async def delete_cases_bulk(self, serial_numbers):
+        """Delete many cases in one commit."""
+        async with self._write() as connection:
+            await connection.executemany("""
+                DELETE FROM cases
+                WHERE serial_number = ?;
+            """, [(serial_number,) for serial_number in serial_numbers])
+
+    async def upsert_cases_bulk(self, cases):
+        """Insert or update cases matched on ``(district, case_number)`` in one transaction.
+
+        Takes ``(district, case_number, party_name, status)`` tuples; a later
+        tuple for the same case wins. Districts match regardless of case and
+        case numbers regardless of letter case, so normalized imports update
+        cases typed in by hand. Returns the inserted and updated counts.
+        """
+        latest = {(case[0].lower(), case[1].upper()): case for case in cases}
+        existing = {}
+        async with self.transaction() as connection:
+            keys = list(latest)
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                cursor = await connection.execute(f"""
+                    SELECT district, case_number, serial_number FROM cases
+                    WHERE upper(case_number) IN ({', '.join('?' * len(chunk))});
+                """, [case_number for _, case_number in chunk])
+                for district, case_number, serial_number in await cursor.fetchall():
+                    existing[(district.lower(), case_number.upper())] = serial_number
+            inserts = [case for key, case in latest.items() if key not in existing]
+            updates = [(*case, existing[key]) for key, case in latest.items() if key in existing]
+            await self.add_cases_bulk(inserts)
+            await self.update_cases_bulk(updates)
+        return len(inserts), len(updates)
+
+    async def apply_case_changes(self, added=(), edited=(), deleted=()):
+        """Apply added, edited and deleted rows in a single transaction.
 
+        ``added`` and ``edited`` take the tuples of ``add_cases_bulk`` and
+        ``update_cases_bulk``; ``deleted`` holds serial numbers.
+        """
+        async with self.transaction():
+            await self.add_cases_bulk(added)
+            await self.update_cases_bulk(edited)
+            await self.delete_cases_bulk(deleted)
+
+    @cached
+    async def data_version(self):
+        """Return the current data version; it grows with every inserted, updated or deleted case."""
+        async with self._read() as connection:
+            cursor = await connection.execute("SELECT version FROM data_version")
+            return (await cursor.fetchone())[0]
+
+    @cached
+    async def changes_since(self, version, limit=CHANGES_LIMIT):
+        """Return the cases changed after ``version``, for patching a copy already loaded.
+
+        The result holds the current ``version``, the ``upserted`` case rows,
+        the ``deleted`` serial numbers and ``reset``, which is true when the
+        copy cannot be patched (version 0, a restore or purged tombstones
+        since ``version``, or more than ``limit`` changed cases, which cost
+        more to patch than to reload) and must be reloaded instead;
+        ``upserted`` and ``deleted`` are then empty.
+        """
+        async with self._read() as connection:
+            cursor = await connection.execute("SELECT version, reset_version FROM data_version")
+            current, reset_version = await cursor.fetchone()
+            changes = {'version': current, 'reset': version < reset_version, 'upserted': [], 'deleted': []}
+            if changes['reset'] or version >= current:
+                return changes
+            cursor = await connection.execute(
+                "SELECT 1 FROM case_versions WHERE version > ? LIMIT 1 OFFSET ?", (version, limit))
+            if await cursor.fetchone():
+                changes['reset'] = True
+                return changes
+            cursor = await connection.execute("""
+                SELECT cases.* FROM case_versions
+                JOIN cases USING (serial_number)
+                WHERE case_versions.version > ? AND NOT case_versions.deleted
+                ORDER BY cases.serial_number DESC;
+            """, (version,))
+            changes['upserted'] = await cursor.fetchall()
+            cursor = await connection.execute("""
+                SELECT serial_number FROM case_versions
+                WHERE version > ? AND deleted
+                ORDER BY serial_number DESC;
+            """, (version,))
+            changes['deleted'] = [row[0] for row in await cursor.fetchall()]
+            return changes
+
+    async def purge_tombstones(self, max_age_days=TOMBSTONE_MAX_AGE_DAYS):
+        """Drop deletion tombstones older than ``max_age_days``; returns how many.
+
+        Sessions that last synced before a dropped tombstone would miss that
+        deletion, so ``reset_version`` moves up to make them reload.
+        """
+        async with self._write() as connection:
+            cursor = await connection.execute("""
+                SELECT MAX(version) FROM case_versions
+                WHERE deleted AND changed_at < datetime('now', ?);
+            """, (f"-{max_age_days} days",))
+            newest = (await cursor.fetchone())[0]
+            if newest is None:
+                return 0
+            cursor = await connection.execute("DELETE FROM case_versions WHERE deleted AND version <= ?", (newest,))
+            await connection.execute("UPDATE data_version SET reset_version = MAX(reset_version, ?)", (newest,))
+            return cursor.rowcount
+
+    @cached
     async def get_case(self, serial_number):
         """Retrieve a case by serial number."""
-        cursor = await self.connection.execute("""
-            SELECT * FROM cases
-            WHERE serial_number = ?;
-        """, (serial_number,))
-        return await cursor.fetchone()
+        async with self._read() as connection:
+            cursor = await connection.execute("""
+                SELECT * FROM cases
+                WHERE serial_number = ?;
+            """, (serial_number,))
+            return await cursor.fetchone()
 
-    async def search_cases(self, query):
-        """Perform a fuzzy search on the party name."""
-        cursor = await self.connection.execute("""
-            SELECT * FROM cases
-            WHERE party_name LIKE ?;
-        """, (f"%{query}%",))
-        return await cursor.fetchall()
+    @cached
+    async def similar_party_names(self, query, limit=10, threshold=0.5):
+        """Return ``(name, similarity, cases)`` for the party names closest to ``query``, best first.
 
-    async def search_all_fields(self, query):
-        """Perform a fuzzy search across all fields."""
-        cursor = await self.connection.execute("""
-            SELECT * FROM cases
-            WHERE district LIKE ? 
-            OR case_number LIKE ?
-            OR party_name LIKE ?
-            OR status LIKE ?
-            ORDER BY serial_number DESC;
-        """, (f"%{query}%", f"%{query}%", f"%{query}%", f"%{query}%"))
-        return await cursor.fetchall()
+        Candidates are the names sharing the most trigrams with the query;
+        they are ranked by edit-distance similarity against the whole name
+        or its closest word, so "Kushwah" finds "Ram Kushwaha". Names are
+        returned lower-cased.
+        """
+        query = ' '.join(query.lower().split())
+        if not query:
+            return []
+        async with self._read() as connection:
+            cursor = await connection.execute("""
+                SELECT party_names.name, party_names.cases, COUNT(*) AS shared
+                FROM (
+                    SELECT DISTINCT substr(' ' || ? || ' ', n, 3) AS trigram FROM ngram_offsets
+                    WHERE n <= length(?)
+                ) AS query_trigrams
+                JOIN party_trigrams USING (trigram)
+                JOIN party_names ON party_names.id = party_trigrams.name_id
+                GROUP BY party_trigrams.name_id
+                ORDER BY shared DESC, party_names.cases DESC
+                LIMIT ?;
+            """, (query, query, FUZZY_CANDIDATES))
+            candidates = await cursor.fetchall()
+        ranked = sorted(
+            ((name, _similarity(query, name), cases) for name, cases, _ in candidates),
+            key=lambda match: (-match[1], -match[2], match[0]),
+        )
+        return [match for match in ranked if match[1] >= threshold][:limit]
+
+    @cached
+    async def search_cases(self, query, limit=50, threshold=0.5):
+        """Fuzzy, typo-tolerant search on the party name, closest names first."""
+        rows = []
+        names = await self.similar_party_names(query, FUZZY_CANDIDATES, threshold)
+        async with self._read() as connection:
+            # Newest cases of the closest name first, until ``limit`` is reached
+            for name, _, _ in names:
+                if len(rows) >= limit:
+                    break
+                cursor = await connection.execute("""
+                    SELECT * FROM cases
+                    WHERE lower(party_name) = ?
+                    ORDER BY serial_number DESC
+                    LIMIT ?;
+                """, (name, limit - len(rows)))
+                rows.extend(await cursor.fetchall())
+        return rows
+
+    @staticmethod
+    def _search_condition(query):
+        """Build the WHERE condition and parameters matching ``query`` as a substring of any field.
+
+        Serves the live table and the archive alike: the trigram index for
+        queries of three characters or more, a LIKE scan for shorter ones.
+        """
+        if len(query) >= TRIGRAM_MIN_LENGTH:
+            return "serial_number IN (SELECT rowid FROM cases_fts WHERE cases_fts MATCH ?)", ['"' + query.replace('"', '""') + '"']
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        condition = ' OR '.join(f"{column} LIKE ? ESCAPE '\\'" for column in ('district', 'case_number', 'party_name', 'status'))
+        return f"({condition})", [pattern] * 4
+
+    def _filter_clause(self, filters):
+        """Build a WHERE clause and its parameters from ``district``, ``status`` and ``query`` filters."""
+        conditions, params = [], []
+        filters = filters or {}
+        for column in ('district', 'status'):
+            if filters.get(column):
+                conditions.append(f"{column} = ?")
+                params.append(filters[column])
+        query = (filters.get('query') or '').strip()
+        if query:
+            condition, search_params = self._search_condition(query)
+            conditions.append(condition)
+            params.extend(search_params)
+        return ' AND '.join(conditions) or '1', params
+
+    @cached
+    async def search_all_fields(self, query, limit=None):
+        """Substring search across all fields, best matches first.
+
+        Queries too short for the trigram index have no ranking and come
+        back newest first.
+        """
+        query = query.strip()
+        if not query:
+            return await self.get_all_cases()
+        async with self._read() as connection:
+            if len(query) < TRIGRAM_MIN_LENGTH:
+                condition, params = self._search_condition(query)
+                cursor = await connection.execute(f"""
+                    SELECT * FROM cases
+                    WHERE {condition}
+                    ORDER BY serial_number DESC
+                    LIMIT ?;
+                """, (*params, -1 if limit is None else limit))
+                return await cursor.fetchall()
+            cursor = await connection.execute("""
+                SELECT cases.* FROM cases_fts
+                JOIN cases ON cases.serial_number = cases_fts.rowid
+                WHERE cases_fts MATCH ?
+                ORDER BY bm25(cases_fts), cases.serial_number DESC
+                LIMIT ?;
+            """, ('"' + query.replace('"', '""') + '"', -1 if limit is None else limit))
+            return await cursor.fetchall()
+
+    @cached
+    async def get_cases_page(self, after_serial=None, limit=50, filters=None):
+        """Get the next page of cases, newest first, that come after ``after_serial``.
+
+        Keyset pagination on the primary key: each page is an index seek, so
+        its cost does not grow with how far the caller has scrolled.
+        """
+        where, params = self._filter_clause(filters)
+        if after_serial is not None:
+            where += " AND serial_number < ?"
+            params.append(after_serial)
+        async with self._read() as connection:
+            cursor = await connection.execute(f"""
+                SELECT * FROM cases
+                WHERE {where}
+                ORDER BY serial_number DESC
+                LIMIT ?;
+            """, (*params, limit))
+            return await cursor.fetchall()
+
+    async def iter_cases(self, filters=None, batch_size=1000):
+        """Yield lists of up to ``batch_size`` cases, newest first, from one open cursor.
+
+        Takes the same filters as ``get_cases_page``. Only one batch is held in
+        memory at a time, so callers can stream any number of rows.
+        """
+        where, params = self._filter_clause(filters)
+        async with self._read() as connection:
+            cursor = await connection.execute(f"""
+                SELECT * FROM cases
+                WHERE {where}
+                ORDER BY serial_number DESC;
+            """, params)
+            try:
+                while True:
+                    rows = await cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                await cursor.close()
+
+    @cached
+    async def count_cases(self, filters=None):
+        """Count the cases matching the given filters."""
+        where, params = self._filter_clause(filters)
+        # Without a search the per-district and status totals already hold the answer
+        table, count = ('cases', 'COUNT(*)') if ((filters or {}).get('query') or '').strip() else ('case_facets', 'COALESCE(SUM(cases), 0)')
+        async with self._read() as connection:
+            cursor = await connection.execute(f"SELECT {count} FROM {table} WHERE {where}", params)
+            return (await cursor.fetchone())[0]
+
+    @cached
+    async def get_facets(self, filters=None):
+        """Return ``{'district': [(district, cases), ...], 'status': [(status, cases), ...]}``, most cases first.
+
+        Each facet counts the cases matching every filter except its own, so
+        its values are the choices left for that filter. Without a search this
+        reads only ``case_facets``; with one, only the matching cases.
+        """
+        filters = filters or {}
+        query = (filters.get('query') or '').strip()
+        async with self._read() as connection:
+            if query:
+                where, params = self._filter_clause({'query': query})
+                cursor = await connection.execute(f"""
+                    SELECT district, status, COUNT(*) FROM cases
+                    WHERE {where}
+                    GROUP BY district, status;
+                """, params)
+            else:
+                cursor = await connection.execute("SELECT district, status, cases FROM case_facets")
+            combinations = await cursor.fetchall()
+        facets = {'district': {}, 'status': {}}
+        for district, status, cases in combinations:
+            if not filters.get('status') or status == filters['status']:
+                facets['district'][district] = facets['district'].get(district, 0) + cases
+            if not filters.get('district') or district == filters['district']:
+                facets['status'][status] = facets['status'].get(status, 0) + cases
+        return {
+            name: sorted(counts.items(), key=lambda item: (-item[1], item[0] or ''))
+            for name, counts in facets.items()
+        }
 
+    @cached
     async def get_all_cases(self):
         """Get all cases ordered by serial number."""
-        cursor = await self.connection.execute("SELECT * FROM cases ORDER BY serial_number DESC")
-        return await cursor.fetchall()
+        async with self._read() as connection:
+            cursor = await connection.execute("SELECT * FROM cases ORDER BY serial_number DESC")
+            return await cursor.fetchall()
+
+    @cached
+    async def get_dashboard_stats(self, recent=5):
+        """Get the admin dashboard metrics.
+
+        ``recent`` counts how many of the last ``recent`` cases ever added are
+        still present, so deletions do not skew it.
+        """
+        async with self._read() as connection:
+            cursor = await connection.execute("SELECT status, SUM(cases) FROM case_facets GROUP BY status")
+            statuses = dict(await cursor.fetchall())
+            cursor = await connection.execute("SELECT COUNT(DISTINCT district) FROM case_facets")
+            districts = (await cursor.fetchone())[0]
+            cursor = await connection.execute("""
+                SELECT COUNT(*) FROM cases
+                WHERE serial_number > COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'cases'), 0) - ?;
+            """, (recent,))
+            recent_count = (await cursor.fetchone())[0]
+            return {
+                'total': sum(statuses.values()),
+                'active': sum(count for status, count in statuses.items() if (status or '').lower() == 'active'),
+                'districts': districts,
+                'recent': recent_count,
+                'statuses': statuses,
+            }
 
     async def close(self):
         """Close the database connection."""
-        await self.connection.close()
\ No newline at end of file
+        if self._archiver is not None:
+            self._archiver.cancel()
+            self._archiver = None
+        if self._reader_pool is not None:
+            while not self._reader_pool.empty():
+                await self._reader_pool.get_nowait().close()
+        await self.connection.close()
+
+
+def _levenshtein(a, b):
+    """Edit distance between two strings."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def _similarity(query, name):
+    """Edit-distance similarity in [0, 1] of ``query`` to ``name`` or to its closest run of words."""
+    words = name.split()
+    width = len(query.split())
+    best = 0.0
+    for phrase in {name, *(' '.join(words[i:i + width]) for i in range(max(1, len(words) - width + 1)))}:
+        best = max(best, 1 - _levenshtein(query, phrase) / max(len(query), len(phrase)))
+    return best
+
+
+def _copy_database(source, target):
+    """Copy one SQLite database over another with the backup API."""
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(target, timeout=PRAGMAS['busy_timeout'] / 1000)
+    try:
+        source_connection.backup(target_connection)
+    finally:
+        target_connection.close()
+        source_connection.close()
+
+
+class SyncDatabase:
+    """Blocking facade over a started Database for synchronous callers such as Streamlit.
+
+    Coroutine methods are run on the database's background loop and async
+    generator methods become plain generators that fetch one item per loop
+    call; every other attribute is passed through unchanged.
+    """
+
+    def __init__(self, database):
+        self.database = database
+
+    def __getattr__(self, name):
+        attribute = getattr(self.database, name)
+        if inspect.isasyncgenfunction(attribute):
+            @functools.wraps(attribute)
+            def iterate(*args, **kwargs):
+                generator = attribute(*args, **kwargs)
+
+                async def next_item():
+                    return await generator.__anext__()
+                try:
+                    while True:
+                        try:
+                            yield self.database.run(next_item())
+                        except StopAsyncIteration:
+                            return
+                finally:
+                    self.database.run(generator.aclose())
+            return iterate
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            return self.database.run(attribute(*args, **kwargs))
+        return call
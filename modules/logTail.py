@@ -0,0 +1,52 @@
+import os
+
+
+def read_last_lines(path, count, end=None, block_size=8192):
+    """Read up to ``count`` lines that end before byte offset ``end``, seeking backwards from it.
+
+    ``end`` defaults to the end of the file. Returns the lines, oldest first,
+    the offset where the first of them starts, which pages further back when
+    passed as ``end``, and the offset just past the last of them, which
+    ``read_new_lines`` continues from. A partly written last line is left
+    out for ``read_new_lines`` to pick up. Only the blocks holding those
+    lines are read, however large the file is.
+    """
+    with open(path, 'rb') as f:
+        if end is None:
+            end = f.seek(0, os.SEEK_END)
+        position, data = end, b''
+        # One extra newline marks the start of the oldest wanted line.
+        while position > 0 and data.count(b'\n') <= count:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    # Drop a partly written last line
+    end -= len(data) - (data.rfind(b'\n') + 1)
+    data = data[:data.rfind(b'\n') + 1]
+    if not data:
+        return [], end, end
+    lines = data.split(b'\n')[:-1][-count:]
+    start = end - len(b'\n'.join(lines)) - 1
+    return [line.decode('utf-8', errors='replace') for line in lines], start, end
+
+
+def read_new_lines(path, offset):
+    """Read the complete lines appended after byte ``offset``.
+
+    Returns the lines and the offset to pass on the next call. A file that
+    has shrunk below ``offset`` was rotated, so it is read from the start.
+    """
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return [], 0
+    if size < offset:
+        offset = 0
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size - offset)
+    # Leave a partly written last line for the next call.
+    complete = data.rfind(b'\n') + 1
+    lines = data[:complete].decode('utf-8', errors='replace').splitlines()
+    return lines, offset + complete
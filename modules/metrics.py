@@ -0,0 +1,231 @@
+import bisect
+import contextlib
+import functools
+import inspect
+import threading
+import time
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Latency histogram with fixed buckets, plus the rows the calls returned."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.rows = 0
+        self.errors = 0
+
+    def observe(self, seconds, rows=None, error=False):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if rows is not None:
+            self.rows += rows
+        if error:
+            self.errors += 1
+
+    def quantile(self, q):
+        """Estimate a latency quantile by interpolating inside its bucket, like Prometheus does."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    """Thread-safe registry of named latency histograms.
+
+    Names are dotted paths such as ``db.get_cases_page`` or
+    ``app.manage_database``; the part before the first dot becomes the
+    ``layer`` label in the Prometheus export.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.started = time.time()
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, rows=None, error=False):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds, rows, error)
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        """Time the block; assign ``rows`` on the yielded dict to record a row count."""
+        sample = {'rows': None}
+        start = time.perf_counter()
+        error = False
+        try:
+            yield sample
+        except Exception:
+            # Not BaseException: Streamlit's rerun and stop, cancellation and
+            # generator exits are control flow, not failed calls
+            error = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, sample['rows'], error)
+
+    def instrument(self, name):
+        """Decorate a function, coroutine function or async generator function with ``timed``.
+
+        List results count as rows; an async generator records one
+        observation when it finishes, covering the time spent producing its
+        batches and the rows in them.
+        """
+        def decorator(function):
+            if inspect.isasyncgenfunction(function):
+                @functools.wraps(function)
+                async def generator(*args, **kwargs):
+                    # Only time spent producing items counts, not the consumer's
+                    iterator = function(*args, **kwargs)
+                    elapsed, rows, error = 0.0, 0, False
+                    try:
+                        while True:
+                            start = time.perf_counter()
+                            try:
+                                item = await iterator.__anext__()
+                            except StopAsyncIteration:
+                                break
+                            finally:
+                                elapsed += time.perf_counter() - start
+                            rows += _rows(item) or 0
+                            yield item
+                    except Exception:
+                        error = True
+                        raise
+                    finally:
+                        await iterator.aclose()
+                        self.observe(name, elapsed, rows, error)
+                return generator
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def coroutine(*args, **kwargs):
+                    with self.timed(name) as sample:
+                        result = await function(*args, **kwargs)
+                        sample['rows'] = _rows(result)
+                        return result
+                return coroutine
+
+            @functools.wraps(function)
+            def call(*args, **kwargs):
+                with self.timed(name) as sample:
+                    result = function(*args, **kwargs)
+                    sample['rows'] = _rows(result)
+                    return result
+            return call
+        return decorator
+
+    def snapshot(self):
+        """Return one summary dict per metric, sorted by total time spent."""
+        with self._lock:
+            summaries = [{
+                'name': name,
+                'calls': histogram.count,
+                'errors': histogram.errors,
+                'total_s': histogram.sum,
+                'mean_ms': histogram.sum / histogram.count * 1000 if histogram.count else 0.0,
+                'p50_ms': histogram.quantile(0.5) * 1000,
+                'p95_ms': histogram.quantile(0.95) * 1000,
+                'p99_ms': histogram.quantile(0.99) * 1000,
+                'rows': histogram.rows,
+            } for name, histogram in self._histograms.items()]
+        return sorted(summaries, key=lambda summary: summary['total_s'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self.started = time.time()
+
+    def prometheus(self, prefix='casemanager'):
+        """Render every histogram in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_call_duration_seconds Time spent per call.",
+            f"# TYPE {prefix}_call_duration_seconds histogram",
+        ]
+        rows, errors = [], []
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                labels = _labels(name)
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_call_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_call_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'{prefix}_call_duration_seconds_sum{{{labels}}} {histogram.sum}')
+                lines.append(f'{prefix}_call_duration_seconds_count{{{labels}}} {histogram.count}')
+                rows.append(f'{prefix}_call_rows_total{{{labels}}} {histogram.rows}')
+                errors.append(f'{prefix}_call_errors_total{{{labels}}} {histogram.errors}')
+        lines += [f"# HELP {prefix}_call_rows_total Rows returned or yielded per call.", f"# TYPE {prefix}_call_rows_total counter", *rows]
+        lines += [f"# HELP {prefix}_call_errors_total Calls that raised.", f"# TYPE {prefix}_call_errors_total counter", *errors]
+        return "\n".join(lines) + "\n"
+
+    def serve(self, address):
+        """Serve ``prometheus()`` at ``/metrics`` on ``(host, port)`` from a daemon thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(address, Handler)
+        threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+        return server
+
+
+def _rows(result):
+    # Only lists are result sets; a tuple is a single row or a pair of counts
+    if isinstance(result, list):
+        return len(result)
+    return None
+
+
+def _labels(name):
+    layer, _, operation = name.partition('.')
+    operation = operation.replace('\\', '\\\\').replace('"', '\\"')
+    return f'layer="{layer}",operation="{operation or layer}"'
+
+
+# Process-wide registry shared by the database layer and the app.
+metrics = Metrics()
+timed = metrics.timed
+instrument = metrics.instrument
+
+
+def instrument_methods(prefix, registry=metrics):
+    """Class decorator that instruments every public coroutine and async generator method of the class."""
+    def decorator(cls):
+        for name, attribute in list(vars(cls).items()):
+            if name.startswith('_') or not (inspect.iscoroutinefunction(attribute) or inspect.isasyncgenfunction(attribute)):
+                continue
+            setattr(cls, name, registry.instrument(f"{prefix}.{name}")(attribute))
+        return cls
+    return decorator
@@ -0,0 +1,87 @@
+import functools
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """In-process LRU/TTL cache of query results, invalidated wholesale on writes.
+
+    Every write bumps ``generation``; results are only stored if no write
+    committed while they were being loaded, so a slow read can never cache
+    data that is already stale.
+    """
+
+    def __init__(self, maxsize=256, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, key, load):
+        """Return the cached result for ``key``, awaiting ``load()`` on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, result = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            del self._entries[key]
+            self.expirations += 1
+        self.misses += 1
+        generation = self.generation
+        result = await load()
+        if generation == self.generation and self.maxsize > 0:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def invalidate(self):
+        """Drop every cached result after a write."""
+        self.generation += 1
+        self._entries.clear()
+        self.invalidations += 1
+
+    def stats(self):
+        """Return the cache counters, for sizing ``maxsize`` and ``ttl``."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'generation': self.generation,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+def _freeze(value):
+    """Turn filter dicts and lists into hashable cache key parts."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def cached(method):
+    """Serve an async read method of Database through its query cache.
+
+    Cached results are shared between callers and must not be mutated.
+    """
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        key = (method.__name__, _freeze(args), _freeze(kwargs))
+        return await self.cache.get_or_load(key, lambda: method(self, *args, **kwargs))
+    return wrapper
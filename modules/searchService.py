@@ -0,0 +1,146 @@
+import asyncio
+import sqlite3
+import threading
+
+from modules.queryCache import _freeze
+
+
+class SearchService:
+    """Debounced, cancellable, coalescing case search on a Database's event loop.
+
+    ``submit``, ``submit_facets`` and ``submit_count`` are called from
+    session threads and return a future at once.
+    A first-page, facets or count request waits ``debounce`` seconds first,
+    and a newer request of the same kind from the same session cancels it,
+    so superseded input never reaches SQLite.
+    Identical requests from any sessions share one execution, which runs on
+    the service's own read connections and is interrupted through the
+    SQLite progress handler once no session is waiting for it any more.
+    """
+
+    def __init__(self, database, debounce=0.3, connections=3, check_every=1000):
+        self.database = database
+        self.debounce = debounce
+        self.connections = connections
+        self.check_every = check_every
+        self._pool = None
+        self._running = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.superseded = 0
+        self.coalesced = 0
+        self.executed = 0
+        self.interrupted = 0
+
+    async def connect(self):
+        """Open the interruptible read connections."""
+        self._pool = asyncio.Queue()
+        for _ in range(self.connections):
+            connection = await self.database.open_reader()
+            cancelled = threading.Event()
+            # A non-zero return aborts the running statement with "interrupted"
+            await connection.set_progress_handler(cancelled.is_set, self.check_every)
+            self._pool.put_nowait((connection, cancelled))
+
+    def start(self):
+        """Connect on the database's background loop and return the service."""
+        self.database.run(self.connect())
+        return self
+
+    def submit(self, session, query, after_serial=None, limit=50, filters=None):
+        """Queue a search for ``session``, superseding its previous one; returns a concurrent future of the rows.
+
+        Runs ``get_cases_page(after_serial, limit, filters)`` with ``query``
+        added to the filters. The future of a superseded request is cancelled.
+        """
+        filters = dict(filters or {}, query=query)
+        # Only the first page is debounced: later pages come from Next and
+        # Previous clicks, not from typing
+        return self._submit(session, 'get_cases_page', (after_serial, limit, filters), after_serial is None)
+
+    def submit_facets(self, session, query, filters=None):
+        """Queue ``get_facets`` for a search, like ``submit``; returns a concurrent future of the facets."""
+        return self._submit(session, 'get_facets', (dict(filters or {}, query=query),), True)
+
+    def submit_count(self, session, query, filters=None):
+        """Queue ``count_cases`` for a search, like ``submit``; returns a concurrent future of the count."""
+        return self._submit(session, 'count_cases', (dict(filters or {}, query=query),), True)
+
+    def _submit(self, session, method, args, debounce):
+        future = asyncio.run_coroutine_threadsafe(self.search(method, args, debounce), self.database.loop)
+        # A session's page, facets and count searches supersede only their own kind
+        pending = (session, method)
+        with self._lock:
+            self.submitted += 1
+            previous = self._pending.get(pending)
+            self._pending[pending] = future
+        if previous is not None and previous.cancel():
+            self.superseded += 1
+        future.add_done_callback(lambda done: self._forget(pending, done))
+        return future
+
+    def _forget(self, pending, future):
+        # Only the session's latest search is tracked, and only until it finishes
+        with self._lock:
+            if self._pending.get(pending) is future:
+                del self._pending[pending]
+
+    async def search(self, method, args, debounce):
+        """Debounce if asked, then join or start the execution of ``method(*args)`` on the database."""
+        if debounce:
+            await asyncio.sleep(self.debounce)
+        key = (method, _freeze(args))
+        execution = self._running.get(key)
+        if execution is None:
+            execution = self._running[key] = {'task': asyncio.ensure_future(self._execute(method, args)), 'waiters': 0}
+            execution['task'].add_done_callback(lambda _: self._running.pop(key, None))
+        else:
+            self.coalesced += 1
+        execution['waiters'] += 1
+        try:
+            return await asyncio.shield(execution['task'])
+        finally:
+            execution['waiters'] -= 1
+            if not execution['waiters'] and not execution['task'].done():
+                execution['task'].cancel()
+                self._running.pop(key, None)
+
+    async def _execute(self, method, args):
+        connection, cancelled = await self._pool.get()
+        self.executed += 1
+        try:
+            with self.database.reading_on(connection):
+                return await getattr(self.database, method)(*args)
+        except asyncio.CancelledError:
+            cancelled.set()
+            self.interrupted += 1
+            raise
+        finally:
+            asyncio.ensure_future(self._release(connection, cancelled))
+
+    async def _release(self, connection, cancelled):
+        # Wait for the statement to stop before the connection is reused
+        try:
+            await connection.execute("SELECT 1")
+        except sqlite3.OperationalError:
+            pass
+        cancelled.clear()
+        self._pool.put_nowait((connection, cancelled))
+
+    def stats(self):
+        """Return the service counters, for the diagnostics tab."""
+        return {
+            'submitted': self.submitted,
+            'superseded': self.superseded,
+            'coalesced': self.coalesced,
+            'executed': self.executed,
+            'interrupted': self.interrupted,
+            'running': len(self._running),
+        }
+
+    async def close(self):
+        """Close the read connections."""
+        while self._pool is not None and not self._pool.empty():
+            connection, _ = self._pool.get_nowait()
+            await connection.close()